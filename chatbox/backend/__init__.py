@@ -5,3 +5,9 @@ import sys
 # 添加项目根目录到Python路径
 sys.path.append(str(Path(__file__).parent.parent))
 
+
+# 添加backend目录到Python路径，使backend内的模块可以互相导入；放在最前面，
+# 避免 llm、metrics、session 等模块名被site-packages中的同名包抢先导入（与 uvicorn 的 app_dir 一致）
+backend_dir = str(Path(__file__).parent)
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
@@ -1,16 +1,35 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
+from contextlib import asynccontextmanager
+import json
+import time
+import uuid
 import uvicorn
+from starlette.requests import Request
 
-from chatbox import chatbot
+from chatbox import get_chatbot, get_chain, close_chain, last_ai_content, profile_store, response_cache, generation_flights, state_store
+from chatbox import BATCH_MAX_ITEMS, BATCH_MAX_CONCURRENCY
+import metrics
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时编译对话图、创建共享的LLM链和连接池，关闭时释放连接"""
+    get_chatbot()
+    get_chain()
+    yield
+    await close_chain()
+    if state_store is not None:
+        state_store.close()
 
 # 创建FastAPI应用
 app = FastAPI(
     title="王锭云个人助手API",
     description="基于LangChain和LangGraph的对话机器人，专门回答关于王锭云的问题",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # 添加CORS中间件
@@ -22,13 +41,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 缓存和会话池的统计在输出 /metrics 时读取；只增不减的次数输出为counter
+metrics.REGISTRY.register(metrics.Counter(
+    "chatbox_response_cache_lookups_total", "回答缓存的查找次数", ["result"]
+)).set_function(lambda: {
+    (result,): response_cache.stats()[key]
+    for result, key in (
+        ("exact_hit", "exact_hits"), ("similar_hit", "similar_hits"), ("shared_hit", "shared_hits"), ("miss", "misses")
+    )
+})
+metrics.REGISTRY.register(metrics.Gauge(
+    "chatbox_response_cache_hit_rate", "回答缓存命中率"
+)).set_function(lambda: response_cache.stats()["hit_rate"])
+metrics.REGISTRY.register(metrics.Gauge(
+    "chatbox_profile_cache_hit_rate", "个人资料缓存命中率"
+)).set_function(lambda: profile_store.stats()["hit_rate"])
+metrics.REGISTRY.register(metrics.Counter(
+    "chatbox_single_flight_requests_total", "需要生成回答的请求数，follower为与其他请求合并的请求", ["role"]
+)).set_function(lambda: {
+    ("leader",): generation_flights.leaders,
+    ("follower",): generation_flights.followers,
+})
+metrics.REGISTRY.register(metrics.Gauge(
+    "chatbox_sessions", "会话池中的会话数"
+)).set_function(lambda: get_chatbot().sessions.stats()["sessions"])
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """记录HTTP请求数、正在处理的请求数和耗时"""
+    metrics.HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        # 按路由模板而不是实际路径分组，避免标签数量无限增长
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+        metrics.HTTP_DURATION.observe(time.perf_counter() - start, method=request.method, path=path)
+
 # 定义请求模型
 class ChatRequest(BaseModel):
     message: str = Field(..., description="用户发送的消息")
+    session_id: Optional[str] = Field(None, description="会话ID，为空时创建新会话")
 
 # 定义响应模型
 class ChatResponse(BaseModel):
     response: str = Field(..., description="助手的回复")
+    session_id: str = Field(..., description="会话ID，后续请求携带以继续对话")
+    token_usage: Dict[str, int] = Field(default_factory=dict, description="本次请求各部分的估算token数")
+
+# 定义批量问答的请求和响应模型
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS, description="相互独立的问题，不使用会话")
+    max_concurrency: Optional[int] = Field(
+        None, ge=1, le=BATCH_MAX_CONCURRENCY, description=f"同时生成回答的数量，默认为{BATCH_MAX_CONCURRENCY}"
+    )
+
+class BatchChatItem(BaseModel):
+    index: int = Field(..., description="问题在请求中的位置")
+    response: Optional[str] = Field(None, description="助手的回复，出错时为空")
+    error: Optional[str] = Field(None, description="处理该问题时的错误")
+    cache_hit: bool = Field(False, description="是否命中回答缓存")
+    token_usage: Dict[str, int] = Field(default_factory=dict, description="该问题各部分的估算token数")
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatItem] = Field(..., description="按请求中的顺序排列的结果")
+    succeeded: int = Field(..., description="成功的问题数")
+    failed: int = Field(..., description="出错的问题数")
 
 # 定义健康检查端点
 @app.get("/health")
@@ -36,17 +120,86 @@ async def health_check() -> Dict[str, str]:
     """健康检查端点"""
     return {"status": "healthy"}
 
+# 定义统计端点
+@app.get("/stats")
+async def stats() -> Dict[str, Any]:
+    """缓存命中率、会话池、请求合并及共享存储统计"""
+    return {
+        "profile_cache": profile_store.stats(),
+        "response_cache": response_cache.stats(),
+        "sessions": get_chatbot().sessions.stats(),
+        "single_flight": generation_flights.stats(),
+        "state_store": state_store.stats() if state_store is not None else None,
+    }
+
+# 定义指标端点
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Prometheus文本格式的指标"""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 # 定义聊天端点
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest) -> ChatResponse:
     """处理聊天请求"""
+    session_id = request.session_id or uuid.uuid4().hex
     try:
         # 调用聊天机器人处理消息
-        response = chatbot.chat(request.message)
-        return ChatResponse(response=response)
+        state = await get_chatbot().arun(request.message, session_id)
+        return ChatResponse(
+            response=last_ai_content(state["messages"]),
+            session_id=session_id,
+            token_usage=state["context"].get("token_usage", {}),
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"处理消息时出错: {str(e)}")
 
+# 定义批量聊天端点
+@app.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest) -> BatchChatResponse:
+    """批量回答相互独立的问题，单个问题出错不影响其他问题"""
+    outcomes = await get_chatbot().abatch(request.questions, request.max_concurrency or BATCH_MAX_CONCURRENCY)
+    results = []
+    for index, outcome in enumerate(outcomes):
+        # 被取消的问题返回 CancelledError（BaseException 的子类），同样只记为该问题的错误
+        if isinstance(outcome, BaseException):
+            results.append(BatchChatItem(index=index, error=f"处理消息时出错: {str(outcome) or type(outcome).__name__}"))
+            continue
+        results.append(BatchChatItem(
+            index=index,
+            response=last_ai_content(outcome["messages"]),
+            cache_hit=bool(outcome["context"].get("cache_hit")),
+            token_usage=outcome["context"].get("token_usage", {}),
+        ))
+    failed = sum(1 for item in results if item.error is not None)
+    return BatchChatResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """格式化一条Server-Sent Events消息"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 定义流式聊天端点
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest) -> StreamingResponse:
+    """以Server-Sent Events的形式逐token返回回复"""
+    session_id = request.session_id or uuid.uuid4().hex
+    
+    async def event_stream():
+        yield sse_event({"session_id": session_id}, event="session")
+        try:
+            async for token in get_chatbot().astream_chat(request.message, session_id):
+                yield sse_event({"token": token})
+            yield sse_event({"session_id": session_id}, event="done")
+        except Exception as e:
+            yield sse_event({"detail": f"处理消息时出错: {str(e)}"}, event="error")
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # 主函数
 def main():
     """启动FastAPI应用"""
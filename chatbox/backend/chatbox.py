@@ -1,102 +1,131 @@
+import asyncio
+import hashlib
 import json
 import os
-from typing import Dict, List, Any, TypedDict, Annotated, Literal
-from pathlib import Path
+from typing import Dict, List, Any, TypedDict, Literal, AsyncIterator, Optional, Tuple, Union
 
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain.memory import ConversationBufferMemory
-
-from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
 from typing_extensions import TypedDict
 
 from dotenv import load_dotenv
 
+from history import HistoryManager
+from llm import get_chat_model, close_http_clients
+from metrics import instrument_node, ainstrument_node
+from embedding import Section
+from profile_store import ProfileSnapshot, ProfileStore
+from response_cache import ResponseCache, normalize_query
+from session import Session, SessionManager, DEFAULT_SESSION_ID
+from single_flight import SingleFlight
+from state_store import create_state_store
+
 load_dotenv()
 
+# 同时进行的LLM对话数量上限
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+# 每个问题检索的资料片段数，以及片段的最低相似度
+RETRIEVE_TOP_K = int(os.getenv("RETRIEVE_TOP_K", "4"))
+RETRIEVE_MIN_SCORE = float(os.getenv("RETRIEVE_MIN_SCORE", "0.05"))
+# 是否合并同时进行的相同问题的LLM调用
+CHAT_SINGLE_FLIGHT = os.getenv("CHAT_SINGLE_FLIGHT", "1").lower() in ("1", "true", "yes")
+# 批量问答：单次请求的问题数上限，以及同时生成回答的数量上限（同时受 CHAT_MAX_CONCURRENCY 限制）
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
 # 定义状态类型
 class AgentState(TypedDict):
     messages: List[Any]
+    # 折叠进摘要的早期对话
+    summary: str
     context: Dict[str, Any]
+    # 是否逐token输出回答（astream_chat）
+    stream: bool
     next: Literal["retrieve", "generate", "end"]
 
-# 加载王锭云的个人资料
-def load_profile_data() -> Dict[str, Any]:
-    """加载王锭云的个人资料数据"""
-    data_path = Path(__file__).parent.parent / "mcp_server" / "data" / "person_profile" / "sample_profiles.json"
+# 会话和回答缓存的共享存储，未配置时为None，只使用进程内状态
+state_store = create_state_store()
+
+# 个人资料缓存，文件变化时才重新加载
+profile_store = ProfileStore()
+
+# 回答缓存，资料版本变化时自动失效
+response_cache = ResponseCache(store=state_store)
+
+# 正在进行的LLM生成，相同的问题和上下文只调用一次LLM
+generation_flights = SingleFlight()
+
+def retrieval_context(profile: ProfileSnapshot, query: str, hits: List[Tuple[float, Section]]) -> Dict[str, Any]:
+    """根据检索到的资料片段（按相关度从高到低排列）构造上下文"""
+    labels = [section.label for _, section in hits]
+    
+    # 系统提示中已有预算内的完整资料，只补充其中没有的片段；资料没有超出预算时为空
+    profile_info, dropped = profile.context.render_missing(labels)
     
-    try:
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return data
-    except Exception as e:
-        print(f"加载个人资料数据失败: {e}")
-        return {}
+    return {
+        "profile_info": profile_info,
+        "query": query,
+        # 检索到的资料片段名，未匹配到时为整个简历
+        "sections": labels or ["*"],
+        "section_scores": {section.label: score for score, section in hits},
+        # 各片段的估算token数，以及因超出token预算被丢弃的片段
+        "section_tokens": profile.context.tokens(labels),
+        "dropped_sections": dropped,
+        "profile_version": profile.version,
+    }
 
 # 创建检索函数
 def retrieve(state: AgentState) -> AgentState:
     """根据用户问题检索相关信息"""
-    profile_data = load_profile_data()
+    profile = profile_store.snapshot()
     
     # 获取最后一条用户消息
     last_message = state["messages"][-1]
     if not isinstance(last_message, HumanMessage):
         return {**state, "next": "generate"}
     
-    query = last_message.content
-    
-    # 简单的关键词匹配逻辑
-    keywords = {
-        "教育": profile_data.get("教育背景", {}),
-        "学校": profile_data.get("教育背景", {}).get("学校", ""),
-        "专业": profile_data.get("教育背景", {}).get("专业", ""),
-        "工作": profile_data.get("工作经历", []),
-        "实习": profile_data.get("工作经历", []),
-        "项目": profile_data.get("项目经历", []),
-        "技能": profile_data.get("专业技能", []),
-        "个人": profile_data.get("个人总结", []),
-        "联系": profile_data.get("邮箱", ""),
-        "邮箱": profile_data.get("邮箱", ""),
-        "年龄": profile_data.get("年龄", ""),
-        "性别": profile_data.get("性别", ""),
-    }
-    
-    # 特定项目名称匹配
-    project_names = [project.get("项目名称", "") for project in profile_data.get("项目经历", [])]
-    for name in project_names:
-        if name:
-            keywords[name] = next((p for p in profile_data.get("项目经历", []) if p.get("项目名称") == name), {})
-    
-    # 特定公司名称匹配
-    company_names = [work.get("公司", "") for work in profile_data.get("工作经历", [])]
-    for name in company_names:
-        if name:
-            keywords[name] = next((w for w in profile_data.get("工作经历", []) if w.get("公司") == name), {})
-    
-    # 检索相关信息
-    relevant_info = {}
-    for key, value in keywords.items():
-        if key.lower() in query.lower():
-            relevant_info[key] = value
-    
-    # 如果没有找到特定信息，返回整个简历
-    if not relevant_info:
-        relevant_info = profile_data
+    # 按向量相似度检索最相关的资料片段，按相关度从高到低排列
+    hits = profile.index.search(last_message.content, RETRIEVE_TOP_K, RETRIEVE_MIN_SCORE)
     
     # 更新上下文
-    state["context"] = {"profile_info": relevant_info}
+    state["context"] = retrieval_context(profile, last_message.content, hits)
     
     return {**state, "next": "generate"}
 
-# 创建回答生成函数
-def generate(state: AgentState) -> AgentState:
-    """生成回答"""
-    # 创建提示模板
-    system_prompt = """你是王锭云的个人助手，你的任务是回答关于王锭云的问题。
+def cacheable(state: AgentState) -> bool:
+    """只有独立的问题（会话中没有之前的对话和摘要）才使用回答缓存
+
+    缓存键不包含对话历史，追问（如“详细说说”）的回答取决于之前的对话，不能在会话间共用。
+    """
+    if "query" not in state["context"] or state.get("summary"):
+        return False
+    _, turns = HistoryManager.split_turns(state["messages"])
+    return len(turns) == 1
+
+# 查找缓存的回答
+def lookup_cache(state: AgentState) -> AgentState:
+    """命中回答缓存时直接使用缓存的回答，跳过LLM调用"""
+    context = state["context"]
+    if not cacheable(state):
+        return {**state, "next": "generate"}
+    
+    cached = response_cache.get(context["query"], context["sections"], context["profile_version"])
+    if cached is None:
+        return {**state, "next": "generate"}
+    
+    context["cache_hit"] = True
+    state["messages"].append(AIMessage(content=cached))
+    return {**state, "next": "end"}
+
+def remember_response(state: AgentState, response: str):
+    """把新生成的回答写入缓存"""
+    context = state["context"]
+    if cacheable(state):
+        response_cache.put(context["query"], context["sections"], context["profile_version"], response)
+
+# 创建提示模板
+# 系统提示只包含固定的指令和完整资料（不超过 CONTEXT_MAX_TOKENS），同一资料版本下逐字节不变，可以被LLM服务端的前缀缓存复用；
+# 摘要、对话历史和系统提示中没有的补充资料片段都放在它之后
+SYSTEM_PROMPT = """你是王锭云的个人助手，你的任务是回答关于王锭云的问题。
     
     请根据提供的个人资料信息回答问题。如果问题与王锭云无关，请礼貌地引导用户询问关于王锭云的信息。
     
@@ -108,32 +137,129 @@ def generate(state: AgentState) -> AgentState:
     5. 回答要有条理
     
     个人资料信息:
-    {profile_info}
+    {profile}
     """
-    
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+
+# 本轮检索到、但因超出token预算不在系统提示中的资料片段，放在当前问题之前
+CONTEXT_PROMPT = "与当前问题相关的补充资料:\n{profile_info}"
+
+# 全局变量，延迟初始化
+_chain = None
+
+def build_prompt():
+    """提示模板：固定的系统提示，之后是 chain_inputs 构造的消息"""
+    # 提示模板等模块导入较慢，在第一次创建链时才导入
+    from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+    return ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="messages"),
     ])
-    
-    # 创建LLM
-    model = ChatOpenAI(
-        model="gpt-4o",
-        temperature=0.7,
+
+def get_chain():
+    """获取共享的 提示模板 -> LLM -> 输出解析 链，只在第一次调用时创建"""
+    global _chain
+    if _chain is None:
+        from langchain_core.output_parsers import StrOutputParser
+        
+        # 创建链，LLM及其HTTP连接池在所有请求间共享
+        _chain = (
+            build_prompt()
+            | get_chat_model()
+            | StrOutputParser()
+        )
+    return _chain
+
+async def close_chain():
+    """释放共享的LLM链及其HTTP连接池"""
+    global _chain
+    _chain = None
+    await close_http_clients()
+
+def prompt_messages(messages: List[Any], summary: str, profile_info: str) -> List[Any]:
+    """系统提示之后的消息：摘要、之前的对话、本轮的补充资料片段、当前问题
+
+    会话开头残留的系统消息（旧版本的会话）不放入提示，保证系统提示之后的前缀只随对话增长而变化。
+    """
+    _, turns = HistoryManager.split_turns(messages)
+    history = HistoryManager.summary_message(summary) + [msg for turn in turns for msg in turn]
+    if not profile_info or not history or not isinstance(history[-1], HumanMessage):
+        return history
+    return history[:-1] + [SystemMessage(content=CONTEXT_PROMPT.format(profile_info=profile_info)), history[-1]]
+
+def chain_inputs(state: AgentState) -> Dict[str, Any]:
+    """构造链的输入，并记录本次请求各部分的估算token数"""
+    profile = profile_store.snapshot().context
+    profile_info = state["context"].get("profile_info", "")
+    summary = state.get("summary", "")
+    state["context"]["token_usage"] = HistoryManager.token_usage(
+        SYSTEM_PROMPT, profile_info, summary, state["messages"], static_profile_tokens=profile.full_tokens
     )
+    return {
+        "messages": prompt_messages(state["messages"], summary, profile_info),
+        "profile": profile.full_text,
+    }
+
+# 创建回答生成函数
+def generate(state: AgentState) -> AgentState:
+    """生成回答"""
+    # 运行链
+    response = get_chain().invoke(chain_inputs(state))
+    remember_response(state, response)
     
-    # 创建链
-    chain = (
-        prompt
-        | model
-        | StrOutputParser()
-    )
+    # 添加AI回复到消息历史
+    state["messages"].append(AIMessage(content=response))
     
-    # 运行链
-    response = chain.invoke({
-        "messages": state["messages"],
-        "profile_info": json.dumps(state["context"]["profile_info"], ensure_ascii=False, indent=2)
-    })
+    return {**state, "next": "end"}
+
+def flight_key(state: AgentState, inputs: Dict[str, Any]) -> str:
+    """合并生成请求的键：归一化的问题 + 检索到的资料片段 + 资料版本 + 之前的对话
+
+    之前的对话（包括摘要）不同时，即使问题相同也不合并。
+    """
+    context = state["context"]
+    history = [(type(msg).__name__, str(msg.content)) for msg in inputs["messages"][:-1]]
+    raw = json.dumps(
+        [normalize_query(context["query"]), sorted(context["sections"]), context["profile_version"], history],
+        ensure_ascii=False,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+async def stream_answer(inputs: Dict[str, Any], publish) -> str:
+    """流式调用LLM链，逐个推送生成的片段，返回完整回答"""
+    parts = []
+    async for chunk in get_chain().astream(inputs):
+        parts.append(chunk)
+        publish(chunk)
+    return "".join(parts)
+
+async def invoke_answer(inputs: Dict[str, Any], publish) -> str:
+    """非流式调用LLM链，完整回答作为一个片段推送，省去逐token处理的开销"""
+    response = await get_chain().ainvoke(inputs)
+    publish(response)
+    return response
+
+async def agenerate(state: AgentState) -> AgentState:
+    """生成回答（异步版本，不阻塞事件循环）
+
+    生成的片段通过 custom 流输出，供 astream_chat 逐token返回；
+    同时进行的相同问题共享同一次LLM调用和同一个片段流，
+    发起调用的请求是非流式请求时，合并进来的流式请求一次收到完整回答。
+    """
+    from langgraph.config import get_stream_writer
+
+    inputs = chain_inputs(state)
+    writer = get_stream_writer()
+    answer = stream_answer if state.get("stream") else invoke_answer
+    if CHAT_SINGLE_FLIGHT and "query" in state["context"]:
+        response = await generation_flights.run(
+            flight_key(state, inputs),
+            lambda publish: answer(inputs, publish),
+            on_chunk=writer,
+        )
+    else:
+        response = await answer(inputs, writer)
+    remember_response(state, response)
     
     # 添加AI回复到消息历史
     state["messages"].append(AIMessage(content=response))
@@ -141,52 +267,158 @@ def generate(state: AgentState) -> AgentState:
     return {**state, "next": "end"}
 
 # 创建对话图
-def create_agent() -> StateGraph:
-    """创建对话代理"""
+def create_agent(entry: str = "retrieve"):
+    """创建对话代理
+
+    entry 为入口节点：批量问答在调用前已完成检索，从 lookup_cache 开始。
+    langgraph 导入较慢，在第一次创建代理时才导入。
+    """
+    from langchain_core.runnables import RunnableLambda
+    from langgraph.graph import StateGraph, END
+
     # 创建工作流
     workflow = StateGraph(AgentState)
     
     # 添加节点
-    workflow.add_node("retrieve", retrieve)
-    workflow.add_node("generate", generate)
+    # 各节点的耗时和异常数记录到 /metrics
+    workflow.add_node("retrieve", instrument_node("retrieve", retrieve))
+    workflow.add_node("lookup_cache", instrument_node("lookup_cache", lookup_cache))
+    # 同步调用 invoke 时走 generate，异步调用 ainvoke 时走 agenerate
+    workflow.add_node("generate", RunnableLambda(
+        instrument_node("generate", generate),
+        afunc=ainstrument_node("generate", agenerate),
+    ))
     
     # 设置入口
-    workflow.set_entry_point("retrieve")
+    workflow.set_entry_point(entry)
     
     # 添加边
-    workflow.add_edge("retrieve", "generate")
+    workflow.add_edge("retrieve", "lookup_cache")
+    # 命中缓存时直接结束，否则调用LLM生成回答
+    workflow.add_conditional_edges("lookup_cache", lambda state: state["next"], {"generate": "generate", "end": END})
     workflow.add_edge("generate", END)
     
     # 编译工作流
     return workflow.compile()
 
+def last_ai_content(messages: List[Any]) -> str:
+    """返回最后一条AI消息"""
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage):
+            return msg.content
+    
+    return "抱歉，处理您的问题时出现了错误。"
+
 # 创建对话接口
 class ChatBot:
-    def __init__(self):
+    def __init__(self, session_manager: SessionManager = None, max_concurrency: int = CHAT_MAX_CONCURRENCY):
         self.agent = create_agent()
-        self.state = {
-            "messages": [
-                SystemMessage(content="你是王锭云的个人助手，请根据提供的资料回答关于王锭云的问题。")
-            ],
+        self.batch_agent = create_agent(entry="lookup_cache")
+        self.sessions = session_manager or SessionManager(store=state_store)
+        self.concurrency = asyncio.Semaphore(max_concurrency)
+        self.history = HistoryManager()
+    
+    def _initial_state(self, session: Session, message: str, stream: bool = False) -> AgentState:
+        """添加用户消息，把超出窗口的旧对话折叠进摘要，构造代理的输入状态"""
+        messages, summary = self.history.fold(session.messages + [HumanMessage(content=message)], session.summary)
+        return {
+            "messages": messages,
+            "summary": summary,
             "context": {},
+            "stream": stream,
             "next": "retrieve"
         }
     
-    def chat(self, message: str) -> str:
+    def chat(self, message: str, session_id: str = DEFAULT_SESSION_ID) -> str:
         """处理用户消息并返回回复"""
-        # 添加用户消息
-        self.state["messages"].append(HumanMessage(content=message))
+        session = self.sessions.get(session_id)
         
         # 运行代理
-        self.state = self.agent.invoke(self.state)
+        state = self.agent.invoke(self._initial_state(session, message))
+        self.sessions.save(session_id, state["messages"], state["summary"])
         
-        # 返回最后一条AI消息
-        for msg in reversed(self.state["messages"]):
-            if isinstance(msg, AIMessage):
-                return msg.content
+        return last_ai_content(state["messages"])
+    
+    async def arun(self, message: str, session_id: str = DEFAULT_SESSION_ID) -> AgentState:
+        """异步处理用户消息并返回代理的最终状态，LLM请求期间不阻塞事件循环"""
+        session = self.sessions.get(session_id)
+        
+        # 同一会话的请求串行处理，避免历史记录交错
+        async with session.lock:
+            # 限制同时进行的LLM对话数量
+            async with self.concurrency:
+                state = await self.agent.ainvoke(self._initial_state(session, message))
+            self.sessions.save(session_id, state["messages"], state["summary"])
+        
+        return state
+    
+    async def achat(self, message: str, session_id: str = DEFAULT_SESSION_ID) -> str:
+        """异步处理用户消息并返回回复"""
+        state = await self.arun(message, session_id)
+        return last_ai_content(state["messages"])
+
+    async def abatch(
+        self, messages: List[str], max_concurrency: int = BATCH_MAX_CONCURRENCY
+    ) -> List[Union[AgentState, BaseException]]:
+        """批量回答相互独立的问题，不读写会话，按输入顺序返回每个问题的最终状态或异常
+
+        先对所有问题一次性完成检索，再并发生成回答：同时进行的数量不超过 max_concurrency，
+        并与其他请求共同受 CHAT_MAX_CONCURRENCY 限制。回答缓存和相同问题的合并照常生效。
+        """
+        profile = profile_store.snapshot()
+        hits = profile.index.search_batch(messages, RETRIEVE_TOP_K, RETRIEVE_MIN_SCORE)
+        limit = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def answer(message: str, item_hits: List[Tuple[float, Section]]) -> AgentState:
+            if not message.strip():
+                raise ValueError("问题为空")
+            state: AgentState = {
+                "messages": [HumanMessage(content=message)],
+                "summary": "",
+                "context": retrieval_context(profile, message, item_hits),
+                "stream": False,
+                "next": "generate",
+            }
+            async with limit:
+                async with self.concurrency:
+                    return await self.batch_agent.ainvoke(state)
+
+        return await asyncio.gather(
+            *(answer(message, item_hits) for message, item_hits in zip(messages, hits)),
+            return_exceptions=True,
+        )
+
+    async def astream_chat(self, message: str, session_id: str = DEFAULT_SESSION_ID) -> AsyncIterator[str]:
+        """流式处理用户消息，逐个产出generate节点生成的token"""
+        session = self.sessions.get(session_id)
         
-        return "抱歉，处理您的问题时出现了错误。"
+        async with session.lock:
+            state = None
+            
+            async with self.concurrency:
+                # custom 模式产出generate节点推送的token，values 模式产出每一步后的完整状态
+                async for mode, chunk in self.agent.astream(
+                    self._initial_state(session, message, stream=True),
+                    stream_mode=["custom", "values"],
+                ):
+                    if mode == "values":
+                        state = chunk
+                    elif chunk:
+                        yield chunk
+            
+            # 命中回答缓存时没有LLM输出，直接产出完整回答
+            if state is not None and state["context"].get("cache_hit"):
+                yield last_ai_content(state["messages"])
+            
+            if state is not None:
+                self.sessions.save(session_id, state["messages"], state["summary"])
 
-# 创建聊天机器人实例
-chatbot = ChatBot()
+# 全局变量，延迟初始化
+_chatbot: Optional[ChatBot] = None
 
+def get_chatbot() -> ChatBot:
+    """获取共享的聊天机器人实例，只在第一次调用时编译对话图"""
+    global _chatbot
+    if _chatbot is None:
+        _chatbot = ChatBot()
+    return _chatbot
@@ -0,0 +1,125 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from embedding import Section
+from history import estimate_tokens
+
+# 提示中资料信息的token预算：系统提示中的完整资料超出时从末尾的片段开始丢弃，
+# 被丢弃的片段只在检索到时补充到本轮提示中，补充的片段至多占用预算的剩余部分（至少保留一个片段）
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "2400"))
+# 标量列表中每项都不超过该长度时合并成一行，否则每项一行
+INLINE_ITEM_MAX_CHARS = 30
+
+
+def format_scalar(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list))
+
+
+def render_value(value: Any, indent: str = "") -> List[str]:
+    """把JSON值渲染成紧凑的“键: 值”文本行
+
+    嵌套的字典和列表按两个空格缩进，由短字符串组成的列表用“、”合并成一行，值为null的键省略。
+    """
+    lines: List[str] = []
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if item is None:
+                continue
+            if is_scalar(item):
+                lines.append(f"{indent}{key}: {format_scalar(item)}")
+            elif isinstance(item, list) and inline_list(item):
+                lines.append(f"{indent}{key}: {'、'.join(format_scalar(x) for x in item)}")
+            else:
+                lines.append(f"{indent}{key}:")
+                lines.extend(render_value(item, indent + "  "))
+    elif isinstance(value, list):
+        if inline_list(value):
+            lines.append(indent + "、".join(format_scalar(x) for x in value))
+        else:
+            for item in value:
+                if is_scalar(item):
+                    lines.append(f"{indent}- {format_scalar(item)}")
+                    continue
+                # 列表项的第一行以“- ”开头，其余行与之对齐
+                item_lines = render_value(item, indent + "  ")
+                if item_lines:
+                    lines.append(f"{indent}- {item_lines[0][len(indent) + 2:]}")
+                    lines.extend(item_lines[1:])
+    elif value is not None:
+        lines.append(indent + format_scalar(value))
+    return lines
+
+
+def inline_list(items: List[Any]) -> bool:
+    return all(is_scalar(x) and x is not None and len(format_scalar(x)) <= INLINE_ITEM_MAX_CHARS for x in items)
+
+
+@dataclass(frozen=True)
+class RenderedSection:
+    """预先渲染的资料片段及其估算token数"""
+    label: str
+    text: str
+    tokens: int
+
+
+def render_section(section: Section) -> RenderedSection:
+    text = "\n".join([f"【{section.label}】"] + render_value(section.value))
+    return RenderedSection(section.label, text, estimate_tokens(text))
+
+
+class ProfileContext:
+    """提示中的资料信息
+
+    加载资料时把每个片段渲染成紧凑文本并估算token数，同时拼接出完整资料；每轮对话只需按相关度挑选片段并拼接，
+    不再对资料做JSON序列化。相比缩进的JSON，省去了括号、引号和缩进占用的token。
+    """
+
+    def __init__(self, sections: List[Section], max_tokens: int = CONTEXT_MAX_TOKENS):
+        self.sections: Dict[str, RenderedSection] = {}
+        for section in sections:
+            self.sections[section.label] = render_section(section)
+        # 资料中的片段顺序
+        self.order = [section.label for section in sections]
+        self.max_tokens = max_tokens
+        # 按资料顺序拼接、不超过token预算的完整资料，作为系统提示中不随对话变化的部分；
+        # 资料超出预算时从末尾丢弃的片段只在检索到时随本轮问题补充
+        self.full_text, self.omitted = self.render(None, max_tokens)
+        self.full_tokens = estimate_tokens(self.full_text)
+
+    def render(
+        self, labels: Optional[Sequence[str]] = None, max_tokens: int = CONTEXT_MAX_TOKENS
+    ) -> Tuple[str, List[str]]:
+        """拼接片段文本，返回 (资料信息, 因超出预算被丢弃的片段名)
+
+        labels 按相关度从高到低排列，为None时使用全部片段。超出 max_tokens 时从最后
+        （相关度最低）的片段开始丢弃，至少保留一个片段。
+        """
+        selected = [self.sections[label] for label in (self.order if labels is None else labels) if label in self.sections]
+        total = sum(section.tokens for section in selected)
+        dropped: List[str] = []
+        while len(selected) > 1 and total > max_tokens:
+            section = selected.pop()
+            total -= section.tokens
+            dropped.append(section.label)
+        return "\n".join(section.text for section in selected), dropped
+
+    def render_missing(self, labels: Sequence[str]) -> Tuple[str, List[str]]:
+        """拼接检索到、但不在系统提示中的片段，返回 (资料信息, 被丢弃的片段名)
+
+        完整资料没有超出预算时系统提示已包含全部片段，返回空文本，检索到的片段不再重复放入提示。
+        补充的片段使用预算中剩余的部分，至少保留一个片段。
+        """
+        missing = [label for label in labels if label in self.omitted]
+        if not missing:
+            return "", []
+        return self.render(missing, self.max_tokens - self.full_tokens)
+
+    def tokens(self, labels: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """各片段的估算token数"""
+        return {label: self.sections[label].tokens for label in (self.order if labels is None else labels) if label in self.sections}
@@ -0,0 +1,190 @@
+import math
+import os
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# 哈希向量的维度，可通过环境变量覆盖
+EMBED_DIM = int(os.getenv("EMBED_DIM", "2048"))
+# 片段名（如“专业技能”“项目经历/…”）的相似度在总得分中的权重
+EMBED_LABEL_WEIGHT = float(os.getenv("EMBED_LABEL_WEIGHT", "1.0"))
+
+# 列表中的字典用这些字段作为片段名，如 项目经历/保时捷公众号文案生成
+ITEM_NAME_KEYS = ("项目名称", "公司", "名称", "标题")
+# 顶层字段的同义说法，和片段名一起编码，让“实习”“联系方式”这类提问也能命中对应片段
+SECTION_ALIASES = {
+    "基本信息": "姓名 性别 年龄 联系方式 邮箱",
+    "教育背景": "教育 学校 大学 专业 学历 成绩",
+    "工作经历": "工作 实习 公司 职位 职责",
+    "项目经历": "项目 做过 开发",
+    "专业技能": "技能 技术 擅长",
+    "个人总结": "个人 总结 评价 优势",
+}
+
+# 连续的英文/数字作为一个词，其余的字母类字符（中文等）按字切分
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[^\W\d_a-z]+")
+# 提问中常见、几乎不携带信息的单字，不作为单字特征
+STOP_CHARS = frozenset("的了吗呢吧么什哪怎是有谁她他你我好请问下多少和与在")
+# 单字特征的权重，低于多字n-gram和英文词
+UNIGRAM_WEIGHT = 0.5
+
+
+@dataclass(frozen=True)
+class Section:
+    """个人资料中可单独检索的一个片段"""
+    label: str
+    value: Any
+    text: str
+    # 片段名及其同义说法
+    label_text: str = ""
+
+
+def flatten_text(value: Any) -> List[str]:
+    """片段中所有键名和标量值的文本"""
+    if isinstance(value, dict):
+        parts = []
+        for key, item in value.items():
+            parts.append(str(key))
+            parts.extend(flatten_text(item))
+        return parts
+    if isinstance(value, list):
+        return [part for item in value for part in flatten_text(item)]
+    return [] if value is None else [str(value)]
+
+
+def chunk_profile(profile: Dict[str, Any]) -> List[Section]:
+    """把个人资料切分成片段
+
+    顶层的标量字段合并为“基本信息”；由字典组成的列表（工作经历、项目经历）每一项是一个片段；
+    其余的顶层字典和列表各是一个片段。
+    """
+    sections: List[Section] = []
+    labels = set()
+
+    def add(key: str, label: str, value: Any):
+        if label in labels:
+            label = f"{label}#{len(sections)}"
+        labels.add(label)
+        label_text = f"{label} {SECTION_ALIASES.get(key, '')}".strip()
+        sections.append(Section(label, value, " ".join([label] + flatten_text(value)), label_text))
+
+    basic = {key: value for key, value in profile.items() if not isinstance(value, (dict, list))}
+    if basic:
+        add("基本信息", "基本信息", basic)
+
+    for key, value in profile.items():
+        key = str(key)
+        if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+            for i, item in enumerate(value):
+                name = next((str(item[k]) for k in ITEM_NAME_KEYS if item.get(k)), str(i + 1))
+                add(key, f"{key}/{name}", item)
+        elif isinstance(value, (dict, list)):
+            add(key, key, value)
+    return sections
+
+
+class Embedder:
+    """本地文本向量化接口，把文本编码成L2归一化的行向量"""
+    dim: int
+
+    def fit(self, texts: List[str]) -> "Embedder":
+        """根据待检索的文本返回可用的编码器，默认不需要拟合"""
+        return self
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingNgramEmbedder(Embedder):
+    """哈希字符n-gram向量化，不依赖模型和网络
+
+    英文/数字按词、中文按1~3字的n-gram取特征，哈希到固定维度，
+    词频取对数后乘以根据待检索文本计算的IDF权重。单字特征降权，常见的虚词单字不计。
+    """
+
+    def __init__(self, dim: int = EMBED_DIM, max_n: int = 3, idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.max_n = max_n
+        self.idf = idf
+
+    def features(self, text: str) -> List[str]:
+        text = unicodedata.normalize("NFKC", text).lower()
+        features = []
+        for token in TOKEN_PATTERN.findall(text):
+            if token.isascii():
+                features.append(token)
+                continue
+            features.extend(ch for ch in token if ch not in STOP_CHARS)
+            for n in range(2, self.max_n + 1):
+                features.extend(token[i:i + n] for i in range(len(token) - n + 1))
+        return features
+
+    def counts(self, texts: List[str]) -> np.ndarray:
+        """对数词频矩阵，未乘IDF、未归一化"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, count in Counter(self.features(text)).items():
+                weight = UNIGRAM_WEIGHT if len(feature) == 1 and not feature.isascii() else 1.0
+                matrix[row, zlib.crc32(feature.encode("utf-8")) % self.dim] += weight * (1.0 + math.log(count))
+        return matrix
+
+    def fit(self, texts: List[str]) -> "HashingNgramEmbedder":
+        document_frequency = np.count_nonzero(self.counts(texts), axis=0)
+        idf = np.log((1.0 + len(texts)) / (1.0 + document_frequency)).astype(np.float32) + 1.0
+        return HashingNgramEmbedder(self.dim, self.max_n, idf)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = self.counts(texts)
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class SectionIndex:
+    """资料片段的向量索引
+
+    片段的内容和片段名在构建时各编码一次，拼成一个矩阵；查询向量按相同方式拼接，
+    一次矩阵-向量乘法即得到 内容余弦相似度 + label_weight × 片段名余弦相似度。
+    片段内容较长时相似度会被稀释，片段名及其同义说法的相似度让“技能”“实习”这类提问能命中对应片段。
+    """
+
+    def __init__(self, sections: List[Section], embedder: Optional[Embedder] = None,
+                 label_weight: float = EMBED_LABEL_WEIGHT):
+        embedder = embedder or HashingNgramEmbedder()
+        texts = [section.text for section in sections]
+        self.sections = sections
+        self.label_weight = label_weight
+        self.embedder = embedder.fit(texts) if sections else embedder
+        if sections:
+            labels = self.embedder.embed([section.label_text or section.label for section in sections])
+            self.matrix = np.hstack([self.embedder.embed(texts), label_weight * labels])
+        else:
+            self.matrix = np.zeros((0, 2 * embedder.dim), dtype=np.float32)
+
+    def search(self, query: str, top_k: int, min_score: float = 0.0) -> List[Tuple[float, Section]]:
+        """返回得分最高的 top_k 个 (得分, 片段)，按得分从高到低排列"""
+        if not self.sections or top_k <= 0:
+            return []
+        vector = self.embedder.embed([query])[0]
+        return self._top(self.matrix @ np.concatenate([vector, vector]), top_k, min_score)
+
+    def search_batch(self, queries: List[str], top_k: int, min_score: float = 0.0) -> List[List[Tuple[float, Section]]]:
+        """批量检索：所有查询一次编码，一次矩阵乘法得到全部得分，按查询顺序返回各自的结果"""
+        if not self.sections or top_k <= 0 or not queries:
+            return [[] for _ in queries]
+        vectors = self.embedder.embed(queries)
+        scores = np.hstack([vectors, vectors]) @ self.matrix.T
+        return [self._top(row, top_k, min_score) for row in scores]
+
+    def _top(self, scores: np.ndarray, top_k: int, min_score: float) -> List[Tuple[float, Section]]:
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        # 得分相同时按片段在资料中的顺序排列
+        top = top[np.lexsort((top, -scores[top]))]
+        return [(float(scores[i]), self.sections[i]) for i in top if scores[i] >= min_score]
@@ -0,0 +1,136 @@
+import math
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+
+# 对话历史窗口配置，可通过环境变量覆盖
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "6"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "2000"))
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "400"))
+
+# 每条消息的角色、分隔符等固定开销
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# 中日韩字符及全角标点各算一个token，连续的字母数字约4个字符一个token，其余符号各算一个
+_TOKEN_PATTERN = re.compile(r"[\u3000-\u303f\u3400-\u9fff\uf900-\ufaff\uff00-\uffef]|[A-Za-z0-9_]+|\S")
+
+# 一轮对话：用户消息及其后的助手回复
+Turn = List[BaseMessage]
+
+
+def estimate_tokens(text: str) -> int:
+    """在本地粗略估算文本的token数，不依赖分词器和网络"""
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text or ""):
+        if piece[0].isascii() and (piece[0].isalnum() or piece[0] == "_"):
+            tokens += math.ceil(len(piece) / 4)
+        else:
+            tokens += 1
+    return tokens
+
+
+def estimate_message_tokens(messages: List[BaseMessage]) -> int:
+    """估算消息列表的token数"""
+    return sum(estimate_tokens(str(msg.content)) + MESSAGE_OVERHEAD_TOKENS for msg in messages)
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit] + "…"
+
+
+def summarize_turns(turns: List[Turn]) -> str:
+    """默认的摘要方式：每轮对话截取问题和回答的开头，在本地完成，不额外调用LLM"""
+    lines = []
+    for turn in turns:
+        question = next((m.content for m in turn if isinstance(m, HumanMessage)), "")
+        answer = next((m.content for m in turn if isinstance(m, AIMessage)), "")
+        lines.append(f"用户问: {_shorten(question, 60)}；助手答: {_shorten(answer, 80)}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """按token预算管理对话历史
+
+    最近 max_turns 轮对话原样保留，更早的对话折叠进滚动摘要；
+    保留的对话超过 max_tokens 时继续把最早的一轮折叠进摘要。
+    """
+
+    def __init__(
+        self,
+        max_turns: int = HISTORY_MAX_TURNS,
+        max_tokens: int = HISTORY_MAX_TOKENS,
+        summary_max_tokens: int = HISTORY_SUMMARY_MAX_TOKENS,
+        summarizer: Optional[Callable[[List[Turn]], str]] = None,
+    ):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summarizer = summarizer or summarize_turns
+
+    @staticmethod
+    def split_turns(messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[Turn]]:
+        """拆分出开头的系统消息和按用户消息划分的各轮对话"""
+        head = []
+        index = 0
+        while index < len(messages) and isinstance(messages[index], SystemMessage):
+            head.append(messages[index])
+            index += 1
+
+        turns: List[Turn] = []
+        for msg in messages[index:]:
+            if isinstance(msg, HumanMessage) or not turns:
+                turns.append([msg])
+            else:
+                turns[-1].append(msg)
+        return head, turns
+
+    def fold(self, messages: List[BaseMessage], summary: str = "") -> Tuple[List[BaseMessage], str]:
+        """把超出窗口的旧对话折叠进摘要，返回 (保留的消息, 新摘要)"""
+        head, turns = self.split_turns(messages)
+
+        # 最后一轮（当前问题）始终保留
+        keep_from = max(0, len(turns) - max(self.max_turns, 1))
+        while keep_from < len(turns) - 1 and estimate_message_tokens(
+            [msg for turn in turns[keep_from:] for msg in turn]
+        ) > self.max_tokens:
+            keep_from += 1
+
+        if keep_from:
+            folded = self.summarizer(turns[:keep_from])
+            summary = self._truncate_summary(f"{summary}\n{folded}" if summary else folded)
+
+        kept = [msg for turn in turns[keep_from:] for msg in turn]
+        return head + kept, summary
+
+    def _truncate_summary(self, summary: str) -> str:
+        """摘要超出预算时丢弃最早的行"""
+        lines = summary.split("\n")
+        while len(lines) > 1 and estimate_tokens(summary) > self.summary_max_tokens:
+            lines.pop(0)
+            summary = "\n".join(lines)
+        return summary
+
+    @staticmethod
+    def summary_message(summary: str) -> List[BaseMessage]:
+        """把摘要包装成系统消息"""
+        if not summary:
+            return []
+        return [SystemMessage(content=f"之前的对话摘要:\n{summary}")]
+
+    @staticmethod
+    def token_usage(
+        system_prompt: str, profile_info: str, summary: str, messages: List[BaseMessage], static_profile_tokens: int = 0
+    ) -> Dict[str, int]:
+        """统计一次请求中各部分的估算token数，static_profile_tokens 为系统提示中完整资料的token数"""
+        usage = {
+            "system": estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS,
+            "static_profile": static_profile_tokens,
+            "profile": estimate_tokens(profile_info),
+            "summary": estimate_message_tokens(HistoryManager.summary_message(summary)),
+            "history": estimate_message_tokens(messages),
+        }
+        usage["total"] = sum(usage.values())
+        return usage
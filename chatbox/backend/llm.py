@@ -0,0 +1,85 @@
+import importlib.util
+import os
+from typing import TYPE_CHECKING, Optional, Tuple
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+from metrics import LLMMetricsHandler
+
+# LLM及连接池配置，可通过环境变量覆盖
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+# auto: 安装了h2时启用HTTP/2；1/0: 强制开启/关闭
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto").lower()
+
+# 全局变量，延迟初始化
+_http_clients: Optional[Tuple["httpx.Client", "httpx.AsyncClient"]] = None
+_chat_model: Optional["ChatOpenAI"] = None
+
+
+def http2_enabled() -> bool:
+    """是否使用HTTP/2（httpx需要额外安装h2）"""
+    if LLM_HTTP2 in ("1", "true", "yes"):
+        return True
+    if LLM_HTTP2 in ("0", "false", "no"):
+        return False
+    return importlib.util.find_spec("h2") is not None
+
+
+def get_http_clients() -> Tuple["httpx.Client", "httpx.AsyncClient"]:
+    """获取共享的同步/异步HTTP客户端，复用keep-alive连接，避免每轮对话重新握手"""
+    global _http_clients
+    if _http_clients is None:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+        )
+        http2 = http2_enabled()
+        _http_clients = (
+            httpx.Client(limits=limits, http2=http2, timeout=LLM_TIMEOUT),
+            httpx.AsyncClient(limits=limits, http2=http2, timeout=LLM_TIMEOUT),
+        )
+    return _http_clients
+
+
+def get_chat_model() -> "ChatOpenAI":
+    """获取共享的ChatOpenAI实例
+
+    langchain_openai（连同openai SDK和httpx）导入较慢，在第一次创建模型时才导入。
+    """
+    global _chat_model
+    if _chat_model is None:
+        from langchain_openai import ChatOpenAI
+
+        http_client, http_async_client = get_http_clients()
+        _chat_model = ChatOpenAI(
+            model=LLM_MODEL,
+            temperature=LLM_TEMPERATURE,
+            timeout=LLM_TIMEOUT,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            # 流式输出时也返回token用量，供 /metrics 统计
+            stream_usage=True,
+            callbacks=[LLMMetricsHandler()],
+        )
+    return _chat_model
+
+
+async def close_http_clients():
+    """关闭共享的HTTP客户端，释放连接池"""
+    global _http_clients, _chat_model
+    if _http_clients is not None:
+        http_client, http_async_client = _http_clients
+        _http_clients = None
+        _chat_model = None
+        http_client.close()
+        await http_async_client.aclose()
@@ -0,0 +1,267 @@
+import functools
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# 耗时直方图的默认分桶（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# token数直方图的分桶
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+
+LabelValues = Tuple[str, ...]
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """按标签值分组的指标，输出Prometheus文本格式"""
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], Any]] = None
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def set_function(self, function: Callable[[], Any]):
+        """输出时调用 function 取值；有标签时 function 返回 {标签值元组: 值}"""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            values = self._function()
+            if not isinstance(values, dict):
+                values = {(): values}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}" for key, value in values.items()]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """只增不减的计数；计数由其他对象维护时用 set_function 在输出时读取"""
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """可增可减的当前值；设置了取值函数时在输出时调用"""
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """分桶计数的观测值分布"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 标签值 -> (各桶计数, 总和, 次数)
+        self._values: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, total + value, count + 1)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        lines = []
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(self.labelnames, key, f'le="{format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """已注册指标的集合"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # 重复导入模块时返回已注册的同名指标
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """Prometheus文本格式（text/plain; version=0.0.4）"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# HTTP请求
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "chatbox_http_requests_total", "HTTP请求数", ["method", "path", "status"]))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "chatbox_http_requests_in_flight", "正在处理的HTTP请求数"))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "chatbox_http_request_duration_seconds", "HTTP请求耗时（流式响应只计到开始返回）", ["method", "path"]))
+
+# LangGraph节点
+NODE_DURATION = REGISTRY.register(Histogram(
+    "chatbox_node_duration_seconds", "LangGraph节点耗时", ["node"]))
+NODE_ERRORS = REGISTRY.register(Counter(
+    "chatbox_node_errors_total", "LangGraph节点抛出的异常数", ["node"]))
+
+# LLM调用
+LLM_TTFT = REGISTRY.register(Histogram(
+    "chatbox_llm_time_to_first_token_seconds", "LLM首token耗时，非流式调用等于总耗时"))
+LLM_DURATION = REGISTRY.register(Histogram(
+    "chatbox_llm_duration_seconds", "LLM调用总耗时", ["status"]))
+LLM_TOKENS = REGISTRY.register(Counter(
+    "chatbox_llm_tokens_total", "LLM消耗的token数，cached_prompt 为命中服务端前缀缓存的prompt token数", ["kind"]))
+LLM_PROMPT_TOKENS = REGISTRY.register(Histogram(
+    "chatbox_llm_prompt_tokens", "每次LLM调用的prompt token数", buckets=TOKEN_BUCKETS))
+LLM_CACHED_PROMPT_RATIO = REGISTRY.register(Histogram(
+    "chatbox_llm_cached_prompt_ratio", "每次LLM调用中命中前缀缓存的prompt token占比",
+    buckets=(0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)))
+
+
+def instrument_node(name: str, func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """包装同步节点函数，记录耗时和异常"""
+    @functools.wraps(func)
+    def wrapper(state):
+        start = time.perf_counter()
+        try:
+            return func(state)
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - start, node=name)
+    return wrapper
+
+
+def ainstrument_node(name: str, func: Callable[[Any], Awaitable[Any]]) -> Callable[[Any], Awaitable[Any]]:
+    """包装异步节点函数，记录耗时和异常"""
+    @functools.wraps(func)
+    async def wrapper(state):
+        start = time.perf_counter()
+        try:
+            return await func(state)
+        except Exception:
+            NODE_ERRORS.inc(node=name)
+            raise
+        finally:
+            NODE_DURATION.observe(time.perf_counter() - start, node=name)
+    return wrapper
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """记录每次LLM调用的首token耗时、总耗时和token用量"""
+    # 回调很轻，直接在事件循环中执行，不切换到线程池
+    run_inline = True
+
+    def __init__(self):
+        # run_id -> (开始时间, 是否已收到首token)
+        self._runs: Dict[UUID, List[Any]] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None and not run[1]:
+            run[1] = True
+            LLM_TTFT.observe(time.perf_counter() - run[0])
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            elapsed = time.perf_counter() - run[0]
+            if not run[1]:
+                LLM_TTFT.observe(elapsed)
+            LLM_DURATION.observe(elapsed, status="ok")
+
+        prompt_tokens, completion_tokens, cached_tokens = token_counts(response)
+        if prompt_tokens is not None:
+            LLM_TOKENS.inc(prompt_tokens, kind="prompt")
+            LLM_PROMPT_TOKENS.observe(prompt_tokens)
+        if completion_tokens is not None:
+            LLM_TOKENS.inc(completion_tokens, kind="completion")
+        if cached_tokens is not None:
+            LLM_TOKENS.inc(cached_tokens, kind="cached_prompt")
+            if prompt_tokens:
+                LLM_CACHED_PROMPT_RATIO.observe(cached_tokens / prompt_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            LLM_DURATION.observe(time.perf_counter() - run[0], status="error")
+
+
+def token_counts(response: LLMResult) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """从LLM结果中取出 (prompt token数, completion token数, 命中前缀缓存的prompt token数)，没有用量信息时为None"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                cached = (usage.get("input_token_details") or {}).get("cache_read")
+                return usage.get("input_tokens"), usage.get("output_tokens"), cached
+
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+    return usage.get("prompt_tokens"), usage.get("completion_tokens"), cached
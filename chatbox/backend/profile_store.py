@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from context_render import ProfileContext
+from embedding import Embedder, SectionIndex, chunk_profile
+
+# 默认的个人资料文件路径
+DEFAULT_PROFILE_PATH = Path(__file__).parent.parent / "mcp_server" / "data" / "person_profile" / "sample_profiles.json"
+
+
+@dataclass(frozen=True)
+class ProfileSnapshot:
+    """某一版本个人资料的只读快照"""
+    data: Dict[str, Any]
+    # 资料片段的向量索引，加载资料时构建一次
+    index: SectionIndex = field(default_factory=lambda: SectionIndex([]))
+    # 预先渲染的片段文本，加载资料时构建一次
+    context: ProfileContext = field(default_factory=lambda: ProfileContext([]))
+    version: str = ""
+
+
+class ProfileStore:
+    """个人资料缓存
+
+    只在文件的 mtime/大小 变化且内容哈希不同时才重新解析JSON并重建片段索引，
+    其余情况直接返回缓存的快照。embedder 为空时使用本地的哈希n-gram向量化。
+    """
+
+    def __init__(self, path: Path = DEFAULT_PROFILE_PATH, embedder: Optional[Embedder] = None):
+        self.path = Path(path)
+        self.embedder = embedder
+        self._lock = threading.Lock()
+        self._stat_key: Optional[Tuple[int, int]] = None
+        self._digest: Optional[str] = None
+        self._snapshot = ProfileSnapshot(data={})
+        self.hits = 0
+        self.misses = 0
+
+    def snapshot(self) -> ProfileSnapshot:
+        """获取当前的资料快照，必要时重新加载"""
+        try:
+            stat = os.stat(self.path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            print(f"加载个人资料数据失败: {e}")
+            stat_key = None
+
+        with self._lock:
+            if stat_key is not None and stat_key == self._stat_key:
+                self.hits += 1
+                return self._snapshot
+
+            self.misses += 1
+            if stat_key is None:
+                self._stat_key = None
+                self._digest = None
+                self._snapshot = ProfileSnapshot(data={})
+                return self._snapshot
+
+            self._reload(stat_key)
+            return self._snapshot
+
+    def _reload(self, stat_key: Tuple[int, int]):
+        """读取文件，内容哈希未变时只更新 mtime，不重新解析"""
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except OSError as e:
+            print(f"加载个人资料数据失败: {e}")
+            return
+
+        digest = hashlib.sha256(raw).hexdigest()
+        self._stat_key = stat_key
+        if digest == self._digest:
+            return
+
+        try:
+            data = json.loads(raw.decode("utf-8"))
+        except Exception as e:
+            print(f"加载个人资料数据失败: {e}")
+            data = {}
+
+        self._digest = digest
+        sections = chunk_profile(data) if isinstance(data, dict) else []
+        self._snapshot = ProfileSnapshot(
+            data=data,
+            index=SectionIndex(sections, self.embedder),
+            context=ProfileContext(sections),
+            version=digest[:12],
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "version": self._snapshot.version,
+            }
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, List, Optional, Set
+
+from state_store import StateStore
+
+# 回答缓存配置，可通过环境变量覆盖
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+# 相似度阈值，设为0时只做精确匹配
+RESPONSE_CACHE_SIMILARITY = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0.85"))
+
+# 回答在共享存储中的命名空间
+RESPONSE_NAMESPACE = "response"
+
+
+def normalize_query(query: str) -> str:
+    """归一化用户问题：全角转半角、转小写、去掉空白和标点"""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return "".join(ch for ch in query if unicodedata.category(ch)[0] in ("L", "N"))
+
+
+def char_ngrams(text: str, n: int = 2) -> FrozenSet[str]:
+    """字符n-gram集合，用于近似匹配"""
+    if len(text) <= n:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + n] for i in range(len(text) - n + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class CacheEntry:
+    response: str
+    normalized: str
+    ngrams: FrozenSet[str]
+    bucket: str
+    expires_at: float
+
+
+class ResponseCache:
+    """回答缓存
+
+    以 归一化问题 + 检索到的资料片段 + 资料版本 为键；精确匹配未命中时，
+    在检索到相同资料片段的条目中按字符n-gram相似度查找近似问题。
+    资料版本变化时清空缓存。键中不包含对话历史，调用方只应缓存不依赖之前对话的独立问题。
+
+    设置了共享存储时，回答同时写入存储，本地精确匹配未命中时再查存储，
+    多个worker进程共享缓存的回答；近似匹配只在本地进行。键中包含资料版本，旧版本的回答不会被命中。
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+        similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+        store: Optional[StateStore] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.store = store
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        # bucket -> 该bucket下的缓存键，近似匹配只在同一bucket内进行
+        self._buckets: Dict[str, Set[str]] = {}
+        self._version = ""
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def bucket_of(sections: List[str], version: str) -> str:
+        return f"{version}|{','.join(sorted(sections))}"
+
+    @staticmethod
+    def key_of(normalized: str, bucket: str) -> str:
+        return hashlib.sha1(f"{bucket}|{normalized}".encode("utf-8")).hexdigest()
+
+    def sync_version(self, version: str):
+        """资料版本变化时清空缓存"""
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._buckets.clear()
+                self._version = version
+
+    def get(self, query: str, sections: List[str], version: str) -> Optional[str]:
+        """查找缓存的回答，未命中时返回None"""
+        self.sync_version(version)
+        normalized = normalize_query(query)
+        bucket = self.bucket_of(sections, version)
+        key = self.key_of(normalized, bucket)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.response
+
+            if self.store is not None:
+                response = self.store.get(RESPONSE_NAMESPACE, key)
+                if response is not None:
+                    self._insert(key, normalized, bucket, response, now)
+                    self.shared_hits += 1
+                    return response
+
+            if self.similarity_threshold > 0:
+                ngrams = char_ngrams(normalized)
+                best_key, best_score = None, self.similarity_threshold
+                for candidate_key in self._buckets.get(bucket, ()):
+                    candidate = self._entries[candidate_key]
+                    if candidate.expires_at <= now:
+                        continue
+                    score = jaccard(ngrams, candidate.ngrams)
+                    if score >= best_score:
+                        best_key, best_score = candidate_key, score
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    self.similar_hits += 1
+                    return self._entries[best_key].response
+
+            self.misses += 1
+            return None
+
+    def put(self, query: str, sections: List[str], version: str, response: str):
+        """缓存回答，超过容量时淘汰最久未使用的条目"""
+        normalized = normalize_query(query)
+        if not normalized or self.max_entries <= 0:
+            return
+        bucket = self.bucket_of(sections, version)
+        key = self.key_of(normalized, bucket)
+
+        with self._lock:
+            if version != self._version:
+                return
+            self._insert(key, normalized, bucket, response, time.monotonic())
+            if self.store is not None:
+                self.store.set(RESPONSE_NAMESPACE, key, response, ttl=self.ttl_seconds)
+
+    def _insert(self, key: str, normalized: str, bucket: str, response: str, now: float):
+        """写入本地缓存，超过容量时淘汰最久未使用的条目"""
+        if key not in self._entries:
+            self._buckets.setdefault(bucket, set()).add(key)
+        self._entries[key] = CacheEntry(
+            response=response,
+            normalized=normalized,
+            ngrams=char_ngrams(normalized),
+            bucket=bucket,
+            expires_at=now + self.ttl_seconds,
+        )
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._buckets[old_entry.bucket].discard(old_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            if self.store is not None:
+                self.store.clear(RESPONSE_NAMESPACE)
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits + self.shared_hits
+            total = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
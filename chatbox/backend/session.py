@@ -0,0 +1,178 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, SystemMessage, messages_from_dict, messages_to_dict
+
+from state_store import StateStore
+
+# 会话池配置，可通过环境变量覆盖
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "1000"))
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "40"))
+SESSION_MAX_MEMORY_BYTES = int(os.getenv("SESSION_MAX_MEMORY_BYTES", str(64 * 1024 * 1024)))
+
+DEFAULT_SESSION_ID = "default"
+
+# 会话在共享存储中的命名空间
+SESSION_NAMESPACE = "session"
+
+
+def estimate_message_bytes(messages: List[BaseMessage]) -> int:
+    """粗略估算消息列表占用的内存（按内容的UTF-8字节数计算）"""
+    return sum(len(str(msg.content).encode("utf-8")) for msg in messages)
+
+
+@dataclass
+class Session:
+    """单个会话的状态"""
+    session_id: str
+    messages: List[BaseMessage]
+    # 折叠进摘要的早期对话
+    summary: str = ""
+    last_access: float = field(default_factory=time.monotonic)
+    size: int = 0
+    # 同一会话的请求串行执行，避免历史记录交错
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    # 最近一次从共享存储读取或写入的会话记录，未变化时不重新解析
+    stored: Optional[str] = None
+
+
+class SessionManager:
+    """按会话ID管理对话状态，支持LRU/TTL淘汰和总内存上限
+
+    设置了共享存储时，每轮对话后的消息和摘要写入存储，取出会话时以存储中的记录为准，
+    多个worker进程可以先后处理同一个会话的请求。同一会话的请求只在同一进程内串行执行。
+    """
+
+    def __init__(
+        self,
+        initial_messages: Optional[Callable[[], List[BaseMessage]]] = None,
+        max_sessions: int = SESSION_MAX_SESSIONS,
+        ttl_seconds: float = SESSION_TTL_SECONDS,
+        max_messages: int = SESSION_MAX_MESSAGES,
+        max_memory_bytes: int = SESSION_MAX_MEMORY_BYTES,
+        store: Optional[StateStore] = None,
+    ):
+        self.initial_messages = initial_messages or list
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self.max_memory_bytes = max_memory_bytes
+        self.store = store
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Session:
+        """获取会话，不存在或已过期时新建"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and now - session.last_access > self.ttl_seconds and not session.lock.locked():
+                self._remove(session_id)
+                session = None
+
+            if session is None:
+                messages = self.initial_messages()
+                session = Session(session_id=session_id, messages=messages, size=estimate_message_bytes(messages))
+                self._sessions[session_id] = session
+                self._memory_bytes += session.size
+            else:
+                self._sessions.move_to_end(session_id)
+
+            if self.store is not None:
+                self._sync(session)
+            session.last_access = now
+            self._evict(now)
+            return session
+
+    def _sync(self, session: Session):
+        """存储中的会话记录与本地不同（由其他进程更新或已过期）时，以存储为准"""
+        stored = self.store.get(SESSION_NAMESPACE, session.session_id)
+        if stored == session.stored:
+            return
+        if stored is None:
+            messages, summary = self.initial_messages(), ""
+        else:
+            record = json.loads(stored)
+            messages, summary = messages_from_dict(record["messages"]), record["summary"]
+        size = estimate_message_bytes(messages) + len(summary.encode("utf-8"))
+        self._memory_bytes += size - session.size
+        session.messages = messages
+        session.summary = summary
+        session.size = size
+        session.stored = stored
+
+    def save(self, session_id: str, messages: List[BaseMessage], summary: str = ""):
+        """保存一轮对话后的消息和摘要，超过条数上限时丢弃最早的消息"""
+        messages = self._trim(messages)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = Session(session_id=session_id, messages=[])
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+
+            size = estimate_message_bytes(messages) + len(summary.encode("utf-8"))
+            self._memory_bytes += size - session.size
+            session.messages = messages
+            session.summary = summary
+            session.size = size
+            session.last_access = time.monotonic()
+            if self.store is not None:
+                session.stored = json.dumps(
+                    {"messages": messages_to_dict(messages), "summary": summary}, ensure_ascii=False
+                )
+                self.store.set(SESSION_NAMESPACE, session_id, session.stored, ttl=self.ttl_seconds)
+            self._evict(session.last_access)
+
+    def delete(self, session_id: str):
+        """删除会话"""
+        with self._lock:
+            self._remove(session_id)
+            if self.store is not None:
+                self.store.delete(SESSION_NAMESPACE, session_id)
+
+    def _trim(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """保留开头的系统消息和最近的 max_messages 条消息"""
+        head = [msg for msg in messages[:1] if isinstance(msg, SystemMessage)]
+        body = messages[len(head):]
+        if len(body) <= self.max_messages:
+            return messages
+        return head + body[-self.max_messages:]
+
+    def _remove(self, session_id: str):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._memory_bytes -= session.size
+
+    def _evict(self, now: float):
+        """淘汰过期会话，再按LRU顺序淘汰超出数量或内存上限的会话（跳过正在处理请求的会话）"""
+        for session_id in list(self._sessions):
+            session = self._sessions[session_id]
+            expired = now - session.last_access > self.ttl_seconds
+            over_limit = len(self._sessions) > self.max_sessions or self._memory_bytes > self.max_memory_bytes
+            # 会话按最近访问时间排列，遇到第一个未过期且未超限的会话即可停止
+            if not expired and not over_limit:
+                break
+            if session.lock.locked():
+                continue
+            self._remove(session_id)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """会话池统计"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": self._memory_bytes,
+                "evictions": self.evictions,
+            }
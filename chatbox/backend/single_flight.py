@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# 结束标记，放入订阅队列表示生成已结束
+_END = object()
+
+Publish = Callable[[str], None]
+
+
+class Flight:
+    """一次正在进行的生成：保存已产出的片段，并推送给所有订阅者"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.subscribers: List[asyncio.Queue] = []
+        self.task: Optional[asyncio.Task] = None
+        self.finished = False
+
+    def publish(self, chunk: str):
+        self.chunks.append(chunk)
+        for queue in self.subscribers:
+            queue.put_nowait(chunk)
+
+    def finish(self):
+        self.finished = True
+        for queue in self.subscribers:
+            queue.put_nowait(_END)
+
+    def subscribe(self) -> asyncio.Queue:
+        """订阅片段，中途加入的订阅者先收到已产出的片段"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for chunk in self.chunks:
+            queue.put_nowait(chunk)
+        if self.finished:
+            queue.put_nowait(_END)
+        self.subscribers.append(queue)
+        return queue
+
+
+class SingleFlight:
+    """合并相同键的并发生成请求
+
+    同一个键同时只有一个生成在进行：第一个请求发起生成，其后到达的请求等待同一个结果，
+    并收到同样的流式片段。生成结束后键即被移除，不缓存结果。
+    生成在独立的任务中运行，发起者断开连接时不会影响其他等待者。
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def run(
+        self,
+        key: str,
+        produce: Callable[[Publish], Awaitable[Any]],
+        on_chunk: Optional[Publish] = None,
+    ) -> Any:
+        """执行或加入键为 key 的生成，返回生成结果
+
+        produce 接收一个 publish 函数，用于推送流式片段；每个片段都会传给本请求的 on_chunk。
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.ensure_future(self._lead(key, flight, produce))
+            # 所有等待者都已取消时，避免出现未读取异常的警告
+            flight.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            self.leaders += 1
+        else:
+            self.followers += 1
+
+        queue = flight.subscribe()
+        try:
+            while True:
+                chunk = await queue.get()
+                if chunk is _END:
+                    break
+                if on_chunk is not None:
+                    on_chunk(chunk)
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.subscribers.remove(queue)
+
+    async def _lead(self, key: str, flight: Flight, produce: Callable[[Publish], Awaitable[Any]]) -> Any:
+        try:
+            return await produce(flight.publish)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.finish()
+
+    def stats(self) -> Dict[str, Any]:
+        """合并统计：leaders 为实际发起的生成数，followers 为被合并的请求数"""
+        total = self.leaders + self.followers
+        return {
+            "in_flight": len(self._flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalesced_rate": self.followers / total if total else 0.0,
+        }
@@ -0,0 +1,173 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# 会话和回答缓存的共享存储：留空只使用进程内状态，
+# memory 为进程内存储，sqlite:///路径 为多个worker进程共享的SQLite（WAL模式）
+STATE_STORE = os.getenv("STATE_STORE", "")
+# 多个进程同时写入时等待锁的最长时间（秒）
+STATE_STORE_TIMEOUT = float(os.getenv("STATE_STORE_TIMEOUT", "5"))
+# 每写入多少次清理一次过期的条目
+STATE_STORE_PURGE_EVERY = int(os.getenv("STATE_STORE_PURGE_EVERY", "256"))
+
+# 多worker部署时默认使用的SQLite文件
+DEFAULT_SQLITE_PATH = Path(__file__).parent / "state.db"
+
+
+class StateStore:
+    """按命名空间划分的键值存储，值为字符串，可设置过期时间
+
+    shared 为True表示存储在多个进程间共享，会话和回答缓存需要写入存储并在读取时以存储为准。
+    """
+    shared = False
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    def clear(self, namespace: str):
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    def close(self):
+        pass
+
+
+class MemoryStore(StateStore):
+    """进程内存储，适合单进程部署"""
+
+    def __init__(self):
+        # (命名空间, 键) -> (值, 过期时间)
+        self._items: Dict[Tuple[str, str], Tuple[str, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get((namespace, key))
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.time():
+                del self._items[(namespace, key)]
+                return None
+            return value
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._items[(namespace, key)] = (value, expires_at)
+
+    def delete(self, namespace: str, key: str):
+        with self._lock:
+            self._items.pop((namespace, key), None)
+
+    def clear(self, namespace: str):
+        with self._lock:
+            for item_key in [item_key for item_key in self._items if item_key[0] == namespace]:
+                del self._items[item_key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"backend": "memory", "items": len(self._items)}
+
+
+class SQLiteStore(StateStore):
+    """SQLite存储，多个worker进程通过同一个数据库文件共享会话和回答缓存
+
+    使用WAL模式，读写互不阻塞；synchronous=NORMAL 时提交不等待fsync，
+    单条读写在本地只需几十微秒，可以直接在事件循环中调用。
+    每个线程使用各自的连接。
+    """
+    shared = True
+
+    def __init__(self, path: Path = DEFAULT_SQLITE_PATH, timeout: float = STATE_STORE_TIMEOUT,
+                 purge_every: int = STATE_STORE_PURGE_EVERY):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS kv ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL,"
+            " PRIMARY KEY (namespace, key)"
+            ") WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None 为自动提交，每条语句单独提交
+            conn = sqlite3.connect(str(self.path), timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM kv WHERE namespace = ? AND key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (namespace, key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: str, ttl: Optional[float] = None):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (namespace, key, value, now + ttl if ttl is not None else None),
+        )
+        self._writes += 1
+        if self.purge_every > 0 and self._writes % self.purge_every == 0:
+            conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+    def delete(self, namespace: str, key: str):
+        self._connection().execute("DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace: str):
+        self._connection().execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connection().execute(
+            "SELECT namespace, COUNT(*) FROM kv WHERE expires_at IS NULL OR expires_at > ? GROUP BY namespace",
+            (time.time(),),
+        ).fetchall()
+        return {"backend": "sqlite", "path": str(self.path), "items": dict(rows)}
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def create_state_store(url: str = STATE_STORE) -> Optional[StateStore]:
+    """根据配置创建存储：留空返回None，memory 或 sqlite:///路径（省略路径时使用默认文件）"""
+    if not url:
+        return None
+    if url == "memory":
+        return MemoryStore()
+    if url == "sqlite" or url.startswith("sqlite://"):
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else ""
+        return SQLiteStore(Path(path) if path else DEFAULT_SQLITE_PATH)
+    raise ValueError(f"不支持的存储: {url}")
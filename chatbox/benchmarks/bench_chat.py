@@ -0,0 +1,126 @@
+"""通过FastAPI应用测试 /chat 的端到端吞吐量和延迟，LLM由本地的假OpenAI服务器代替
+
+用法: python benchmarks/bench_chat.py [--requests 200] [--concurrency 16] [--latency 0.2] [--output results/chat.json]
+
+默认每个请求使用不同的问题和会话，并关闭回答缓存的近似匹配，测到的是每次都调用LLM的路径；
+--repeat-queries 让请求从少量问题中循环选取，用于观察回答缓存的效果。
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from harness import summarize, write_results  # noqa: E402
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+QUESTIONS = ["介绍一下王锭云的项目经历", "王锭云会哪些技能", "王锭云在哪里实习过", "王锭云的邮箱是什么"]
+
+
+def start_fake_llm(port: int, latency: float) -> subprocess.Popen:
+    """在子进程中启动假OpenAI服务器，等待其就绪"""
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "fake_openai.py"), "--port", str(port), "--latency", str(latency)],
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("假OpenAI服务器启动失败")
+
+
+def question_for(index: int, repeat_queries: bool) -> str:
+    question = QUESTIONS[index % len(QUESTIONS)]
+    return question if repeat_queries else f"{question}（第{index}次提问）"
+
+
+async def run_load(app, requests: int, concurrency: int, repeat_queries: bool) -> dict:
+    """以固定并发数发送 requests 个 /chat 请求"""
+    latencies, errors = [], 0
+    next_index = iter(range(requests))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as client:
+        async def worker():
+            nonlocal errors
+            for index in next_index:
+                start = time.perf_counter()
+                response = await client.post("/chat", json={"message": question_for(index, repeat_queries)})
+                if response.status_code == 200:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+
+        # 预热：创建LLM链和连接池
+        await client.post("/chat", json={"message": "你好"})
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="假LLM每次请求的耗时（秒）")
+    parser.add_argument("--port", type=int, default=9100, help="假OpenAI服务器的端口")
+    parser.add_argument("--repeat-queries", action="store_true", help="循环使用少量问题，允许命中回答缓存")
+    parser.add_argument("--output", type=Path, help="结果JSON的输出路径")
+    args = parser.parse_args()
+
+    # 后端在导入时读取这些配置，必须先设置
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    if not args.repeat_queries:
+        os.environ["RESPONSE_CACHE_SIMILARITY"] = "0"
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    process = start_fake_llm(args.port, args.latency)
+    try:
+        from app import app
+        from chatbox import close_chain, response_cache
+
+        async def run():
+            try:
+                return await run_load(app, args.requests, args.concurrency, args.repeat_queries)
+            finally:
+                await close_chain()
+
+        result = asyncio.run(run())
+        result["llm_latency_s"] = args.latency
+        result["repeat_queries"] = args.repeat_queries
+        result["response_cache"] = response_cache.stats()
+    finally:
+        process.terminate()
+        process.wait()
+
+    latency = result["latency"]
+    print(f"{result['requests']} 个请求，并发 {result['concurrency']}，错误 {result['errors']}，"
+          f"吞吐 {result['throughput_rps']:.1f} req/s")
+    print(f"延迟 p50 {latency['p50_ms']:.1f} ms  p95 {latency['p95_ms']:.1f} ms  p99 {latency['p99_ms']:.1f} ms")
+    write_results(args.output, {"benchmark": "chat", **result})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""后端检索和MCP服务器各组件在不同规模数据下的耗时
+
+用法: python benchmarks/bench_components.py [--sizes 10,100,1000] [--repeat 20] [--output results/components.json]
+
+对每个规模生成合成资料：MCP服务器使用 size 个资料文件，后端检索使用包含 size 条工作/项目经历的单人资料。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_server"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from corpus import make_large_profile, write_corpus  # noqa: E402
+from harness import format_stats, measure, write_results  # noqa: E402
+
+import server  # noqa: E402
+
+SEARCH_QUERIES = ["Python", "广州", "项目名称", "不存在的关键词"]
+RETRIEVE_QUERIES = ["介绍一下王锭云的项目经历", "王锭云的邮箱是什么", "你好"]
+
+
+def bench_retrieve(size: int, tmp: Path, repeat: int) -> dict:
+    """backend/chatbox.py 中的 retrieve 节点"""
+    from langchain_core.messages import HumanMessage
+
+    import chatbox
+    from profile_store import ProfileStore
+
+    profile_path = tmp / "profile.json"
+    profile_path.write_text(json.dumps(make_large_profile(size), ensure_ascii=False), encoding="utf-8")
+    chatbox.profile_store = ProfileStore(profile_path)
+
+    results = {}
+    for query in RETRIEVE_QUERIES:
+        state = {"messages": [HumanMessage(content=query)], "summary": "", "context": {}, "next": "retrieve"}
+        results[query] = measure(lambda: chatbox.retrieve(dict(state)), repeat)
+        print(format_stats(f"  retrieve {query}", results[query]))
+    return results
+
+
+def bench_mcp(size: int, tmp: Path, repeat: int) -> dict:
+    """MCP服务器：加载数据、搜索和工具返回内容的序列化"""
+    data_dir = write_corpus(tmp / "profiles", size)
+    results = {"load_json_data": measure(lambda: server.DataManager(data_dir=data_dir), max(1, repeat // 5), warmup=0)}
+    print(format_stats("  load_json_data", results["load_json_data"]))
+
+    dm = server.DataManager(data_dir=data_dir)
+    server.data_manager = dm
+    loop = asyncio.new_event_loop()
+    try:
+        results["search_content"] = {}
+        for query in SEARCH_QUERIES:
+            stats = measure(lambda: loop.run_until_complete(dm.search_content(query)), repeat)
+            results["search_content"][query] = stats
+            print(format_stats(f"  search_content {query}", stats))
+
+        tool_calls = {
+            "search_person_profiles": {"query": "Python"},
+            "get_all_profiles": {},
+            "get_all_profiles(unpaged)": {"max_results": size, "max_bytes": 0},
+            "get_all_profiles(unpaged,compact)": {"max_results": size, "max_bytes": 0, "compact": True},
+            "get_profile_by_file": {"file_id": next(iter(dm.data))},
+        }
+        results["call_tool"] = {}
+        for label, arguments in tool_calls.items():
+            name = label.split("(")[0]
+            contents = loop.run_until_complete(server.call_tool(name, arguments))
+            stats = measure(lambda: loop.run_until_complete(server.call_tool(name, arguments)), repeat)
+            stats["response_bytes"] = sum(len(content.text.encode("utf-8")) for content in contents)
+            results["call_tool"][label] = stats
+            print(format_stats(f"  call_tool {label}", stats) + f"  {stats['response_bytes']:>9} B")
+    finally:
+        loop.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000", help="逗号分隔的数据规模")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--log-level", default="WARNING", help="MCP服务器的日志级别")
+    parser.add_argument("--output", type=Path, help="结果JSON的输出路径")
+    args = parser.parse_args()
+
+    server.logger.setLevel(args.log_level.upper())
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = {"benchmark": "components", "repeat": args.repeat, "sizes": {}}
+    for size in sizes:
+        print(f"== size {size}")
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            results["sizes"][str(size)] = {
+                "retrieve": bench_retrieve(size, tmp, args.repeat),
+                "mcp": bench_mcp(size, tmp, args.repeat),
+            }
+
+    write_results(args.output, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""对比MCP服务器搜索请求的两种日志方式的开销：改动前（f-string立即格式化的INFO日志 + 逐个匹配写日志 + 完整结果写日志）
+与改动后（按级别判断、可采样的单行结构化日志，完整结果只在DEBUG下输出）
+
+两次运行走同一条搜索路径（server.call_tool 的 search_person_profiles），只替换日志函数，
+结果中的差异只来自日志。
+
+用法: python benchmarks/bench_search_logging.py [--files 200] [--repeat 5] [--output result.json]
+"""
+import argparse
+import asyncio
+import io
+import logging
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "mcp_server"))
+
+from corpus import write_corpus  # noqa: E402
+from harness import measure, write_results  # noqa: E402
+
+import server  # noqa: E402
+
+QUERIES = ["Python", "广州", "项目名称", "Prompt", "学校", "不存在的关键词"]
+
+
+def legacy_log_event(level, event, **fields):
+    """改动前的请求日志：不判断级别和采样，先用f-string格式化再写INFO日志"""
+    if event == "search":
+        server.logger.info(f"搜索请求: {fields.get('query')}")
+        server.logger.info(f"开始搜索查询: '{fields.get('query')}'")
+        server.logger.info(f"搜索查询 '{fields.get('query')}' 得到 {fields.get('files')} 个结果。")
+    else:
+        server.logger.info(f"{event}: {fields}")
+
+
+def legacy_log_payload(label, payload):
+    """改动前的结果日志：每个匹配一行，再把完整结果写进INFO日志"""
+    for file_id, result in payload.items():
+        for path, value in result.get("matching_content", {}).items():
+            server.logger.info(f"匹配数据: {file_id}:{path} = {value}")
+    server.logger.info(f"{label}: {payload}")
+
+
+@contextmanager
+def legacy_logging():
+    """在同一条搜索路径上换回改动前的日志函数"""
+    log_event, log_payload = server.log_event, server.log_payload
+    server.log_event, server.log_payload = legacy_log_event, legacy_log_payload
+    try:
+        yield
+    finally:
+        server.log_event, server.log_payload = log_event, log_payload
+
+
+@contextmanager
+def current_logging():
+    yield
+
+
+def capture_logs(level: int) -> io.StringIO:
+    """把服务器日志写进内存，计入格式化和写出的开销，但不输出到终端"""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    server.logger.handlers = [handler]
+    server.logger.propagate = False
+    server.logger.setLevel(level)
+    return stream
+
+
+def run_search(query: str, logging_mode, repeat: int) -> dict:
+    stream = capture_logs(logging.INFO)
+    with logging_mode():
+        stats = measure(lambda: asyncio.run(server.call_tool("search_person_profiles", {"query": query})), repeat, warmup=0)
+    stats["log_bytes"] = len(stream.getvalue().encode("utf-8")) // repeat
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="合成资料文件数量")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="结果JSON的输出路径")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_corpus(Path(tmp), args.files)
+        capture_logs(logging.WARNING)
+        server.data_manager = server.DataManager(data_dir=Path(tmp))
+
+        results = {"files": args.files, "queries": {}}
+        for query in QUERIES:
+            # 预热：首次查询的开销不计入任何一方
+            run_search(query, current_logging, 1)
+            before = run_search(query, legacy_logging, args.repeat)
+            after = run_search(query, current_logging, args.repeat)
+            results["queries"][query] = {"before": before, "after": after}
+            print(f"{query:<12} before {before['mean_ms']:8.2f} ms  {before['log_bytes']:>8} B log   "
+                  f"after {after['mean_ms']:8.2f} ms  {after['log_bytes']:>6} B log")
+
+    write_results(args.output, {"benchmark": "search_logging", **results})
+
+
+if __name__ == "__main__":
+    main()
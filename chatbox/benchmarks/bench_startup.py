@@ -0,0 +1,118 @@
+"""命令行聊天界面和API入口的冷启动耗时
+
+用法: python benchmarks/bench_startup.py [--repeat 5] [--budget-ms 300] [--output results/startup.json]
+
+- first_prompt: 从启动 main.py --chat 到出现输入提示符的耗时，超过 --budget-ms 时以非零状态退出；
+- import chatbox / import app: 用 python -X importtime 导入后端模块，统计总耗时和耗时最多的直接依赖。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from harness import ROOT, format_stats, summarize, write_results  # noqa: E402
+
+BACKEND_DIR = ROOT / "backend"
+PROMPT = "您: ".encode("utf-8")
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-bench")
+    env["PYTHONUNBUFFERED"] = "1"
+    return env
+
+
+def time_to_first_prompt(timeout: float = 60.0) -> float:
+    """启动命令行聊天界面，返回出现输入提示符时的耗时（毫秒）"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "main.py"), "--chat"],
+        cwd=ROOT, env=child_env(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    try:
+        while PROMPT not in output:
+            chunk = proc.stdout.read1(4096)
+            if not chunk or time.perf_counter() - start > timeout:
+                raise RuntimeError("命令行聊天界面没有出现输入提示符")
+            output += chunk
+        return (time.perf_counter() - start) * 1000
+    finally:
+        proc.kill()
+        proc.wait()
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """解析 -X importtime 的输出，返回 (最后一个顶层模块的累计耗时, 顶层模块的各个直接依赖及累计耗时)，单位毫秒"""
+    imports: List[Tuple[int, str, float]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # 模块名前有一个空格，每深一级多缩进两个空格
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(cumulative) / 1000))
+    if not imports:
+        return 0.0, []
+    # 输出按导入完成的顺序排列，最后一行是被测模块，往前直到上一个顶层模块为止都是它导入的模块
+    _, _, total = imports[-1]
+    direct = []
+    for depth, name, ms in reversed(imports[:-1]):
+        if depth == 0:
+            break
+        if depth == 1:
+            direct.append((name, ms))
+    return total, sorted(direct, key=lambda item: -item[1])
+
+
+def import_time(module: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """在新进程中导入后端模块，返回 -X importtime 统计的耗时"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0, help="出现输入提示符的耗时上限（p50，毫秒）")
+    parser.add_argument("--top", type=int, default=8, help="列出耗时最多的直接依赖数量")
+    parser.add_argument("--output", type=Path, help="结果JSON的输出路径")
+    args = parser.parse_args()
+
+    # 第一次运行会编译字节码，不计入结果
+    time_to_first_prompt()
+    first_prompt = summarize([time_to_first_prompt() for _ in range(args.repeat)])
+    print(format_stats("first_prompt (main.py --chat)", first_prompt))
+
+    results = {"first_prompt": first_prompt, "budget_ms": args.budget_ms, "imports": {}}
+    for module in ("chatbox", "app"):
+        import_time(module)
+        runs = [import_time(module) for _ in range(args.repeat)]
+        stats = summarize([total for total, _ in runs])
+        _, direct = min(runs, key=lambda run: run[0])
+        results["imports"][module] = {**stats, "slowest_imports_ms": dict(direct[:args.top])}
+        print(format_stats(f"import {module}", stats))
+        for name, ms in direct[:args.top]:
+            print(f"    {name:<36} {ms:9.1f} ms")
+
+    within_budget = first_prompt["p50_ms"] <= args.budget_ms
+    results["within_budget"] = within_budget
+    write_results(args.output, {"benchmark": "startup", **results})
+    if not within_budget:
+        print(f"出现输入提示符的耗时 p50 {first_prompt['p50_ms']:.1f} ms 超过预算 {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
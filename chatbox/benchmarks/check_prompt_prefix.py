@@ -0,0 +1,132 @@
+"""检查发给LLM的提示在多轮对话间是否保持稳定的前缀
+
+用法: python benchmarks/check_prompt_prefix.py [--output results/prompt_prefix.json]
+
+不调用LLM：按 ChatBot 的流程构造每一轮的提示（回答用固定文本代替），检查
+- 系统提示（固定指令 + 完整资料）在所有轮次、所有会话间逐字节相同；
+- 摘要没有变化时，本轮提示以上一轮提示去掉补充资料片段后的部分为前缀；
+- 系统提示之后没有其他固定的系统消息；
+- 本轮补充的资料片段不重复系统提示中已有的片段，资料信息的token数不超过 CONTEXT_MAX_TOKENS（补充片段时至多多出一个片段）。
+任一检查失败时以非零状态退出。
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from context_render import CONTEXT_MAX_TOKENS  # noqa: E402
+from harness import write_results  # noqa: E402
+
+SESSION_QUESTIONS = [
+    ["王锭云会哪些技能", "她在哪里实习过", "她的邮箱是什么", "她做过什么项目", "她的学历",
+     "介绍一下茅台拆稿Bot", "她的GPA是多少", "她擅长前端吗"],
+    ["你好", "王锭云是哪个学校的", "她有什么证书"],
+]
+
+
+def serialize(messages) -> List[bytes]:
+    """按发送给LLM的形式（角色 + 内容）序列化每条消息"""
+    return [json.dumps({"role": msg.type, "content": msg.content}, ensure_ascii=False).encode("utf-8") for msg in messages]
+
+
+def common_prefix_bytes(a: List[bytes], b: List[bytes]) -> int:
+    size = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        size += len(x)
+    return size
+
+
+def run_session(chatbox, chatbot, prompt, session_id: str, questions: List[str], errors: List[str]) -> List[Dict[str, Any]]:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    turns = []
+    previous, previous_summary, previous_stable = None, None, []
+    for i, question in enumerate(questions):
+        session = chatbot.sessions.get(session_id)
+        state = chatbox.retrieve(chatbot._initial_state(session, question))
+        messages = prompt.invoke(chatbox.chain_inputs(state)).to_messages()
+        current = serialize(messages)
+
+        # 系统提示和第一个用户消息之间只允许摘要和本轮补充的资料片段
+        first_human = next((j for j, msg in enumerate(messages) if isinstance(msg, HumanMessage)), len(messages))
+        allowed = ("之前的对话摘要", chatbox.CONTEXT_PROMPT.split("{")[0])
+        if any(not msg.content.startswith(allowed) for msg in messages[1:first_human]):
+            errors.append(f"{session_id} 第{i + 1}轮: 系统提示之后有固定的系统消息")
+
+        # 补充的资料片段不能与系统提示中的完整资料重复，资料信息的总token数受预算约束
+        context_messages = [msg.content for msg in messages[1:first_human] if msg.content.startswith(allowed[1])]
+        repeated = [label for label in state["context"]["sections"]
+                    if any(f"【{label}】" in text for text in context_messages) and f"【{label}】" in messages[0].content]
+        if repeated:
+            errors.append(f"{session_id} 第{i + 1}轮: 补充资料重复了系统提示中的片段 {repeated}")
+        usage = state["context"]["token_usage"]
+        profile_tokens = usage["static_profile"] + usage["profile"]
+        if profile_tokens > CONTEXT_MAX_TOKENS + max(chatbox.profile_store.snapshot().context.tokens().values()):
+            errors.append(f"{session_id} 第{i + 1}轮: 资料信息 {profile_tokens} token 超出预算 {CONTEXT_MAX_TOKENS}")
+
+        summary_changed = previous is not None and state["summary"] != previous_summary
+        prefix = common_prefix_bytes(previous, current) if previous is not None else 0
+        if previous is not None and not summary_changed:
+            if current[:len(previous_stable)] != previous_stable:
+                errors.append(f"{session_id} 第{i + 1}轮: 提示不以上一轮的提示为前缀")
+
+        turns.append({
+            "question": question,
+            "messages": len(current),
+            "prompt_bytes": sum(len(x) for x in current),
+            "system_bytes": len(current[0]),
+            "common_prefix_bytes": prefix,
+            "summary_changed": summary_changed,
+            "system_message": current[0],
+        })
+        chatbot.sessions.save(session_id, state["messages"] + [AIMessage(content=f"关于“{question}”的回答。" * 5)], state["summary"])
+        # 去掉本轮补充的资料片段后，下一轮的提示应以这部分为前缀
+        previous_stable = [x for x, msg in zip(current, messages) if not msg.content.startswith(allowed[1])]
+        previous, previous_summary = current, state["summary"]
+    return turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", type=Path, help="结果JSON的输出路径")
+    args = parser.parse_args()
+
+    import chatbox
+
+    chatbot = chatbox.ChatBot()
+    prompt = chatbox.build_prompt()
+    errors: List[str] = []
+    sessions = {}
+    for n, questions in enumerate(SESSION_QUESTIONS):
+        session_id = f"prefix-check-{n}"
+        sessions[session_id] = run_session(chatbox, chatbot, prompt, session_id, questions, errors)
+
+    systems = {turn.pop("system_message") for turns in sessions.values() for turn in turns}
+    if len(systems) != 1:
+        errors.append(f"系统提示在不同轮次或会话间不同（{len(systems)} 种）")
+
+    for session_id, turns in sessions.items():
+        print(session_id)
+        for i, turn in enumerate(turns):
+            ratio = turn["common_prefix_bytes"] / turn["prompt_bytes"]
+            note = "（摘要变化）" if turn["summary_changed"] else ""
+            print(f"  第{i + 1}轮 消息 {turn['messages']:3d}  提示 {turn['prompt_bytes']:6d} B  "
+                  f"系统提示 {turn['system_bytes']:6d} B  与上一轮共同前缀 {turn['common_prefix_bytes']:6d} B ({ratio:.0%}){note}")
+
+    write_results(args.output, {"benchmark": "prompt_prefix", "sessions": sessions, "errors": errors})
+    if errors:
+        print("\n".join(["检查失败:"] + errors))
+        sys.exit(1)
+    print("系统提示在所有轮次间逐字节相同，提示前缀只随对话增长而变化")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""检查回答缓存不会把依赖对话历史的追问回答在会话间共用
+
+用法: python benchmarks/check_response_cache.py
+
+不调用LLM：用根据完整对话生成的固定文本代替LLM的回答，检查
+- 两个会话先问不同的问题，再问同一个追问时，各自得到基于自己对话的回答，追问不命中缓存；
+- 没有之前对话的独立问题仍然命中缓存。
+任一检查失败时以非零状态退出。
+"""
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+
+async def fake_answer(inputs, publish) -> str:
+    """代替LLM：回答中列出本轮提示里的全部用户问题"""
+    from langchain_core.messages import HumanMessage
+
+    questions = [msg.content for msg in inputs["messages"] if isinstance(msg, HumanMessage)]
+    response = "回答: " + " / ".join(questions)
+    publish(response)
+    return response
+
+
+async def run(errors: List[str]):
+    import chatbox
+
+    chatbox.invoke_answer = fake_answer
+    chatbot = chatbox.ChatBot()
+
+    async def ask(session_id: str, message: str):
+        state = await chatbot.arun(message, session_id)
+        return chatbox.last_ai_content(state["messages"]), bool(state["context"].get("cache_hit"))
+
+    await ask("cache-check-a", "她做过什么项目")
+    await ask("cache-check-b", "她的邮箱是什么")
+    answer_a, hit_a = await ask("cache-check-a", "详细说说")
+    answer_b, hit_b = await ask("cache-check-b", "详细说说")
+    print(f"会话A追问: {answer_a}{'（缓存）' if hit_a else ''}")
+    print(f"会话B追问: {answer_b}{'（缓存）' if hit_b else ''}")
+    if hit_a or hit_b:
+        errors.append("追问命中了回答缓存")
+    if "邮箱" not in answer_b or answer_a == answer_b:
+        errors.append("会话B的追问得到了其他会话的回答")
+
+    answer_c, hit_c = await ask("cache-check-c", "她做过什么项目")
+    print(f"会话C独立问题: {answer_c}{'（缓存）' if hit_c else ''}")
+    if not hit_c:
+        errors.append("独立问题没有命中回答缓存")
+
+
+def main():
+    errors: List[str] = []
+    asyncio.run(run(errors))
+    if errors:
+        print("\n".join(["检查失败:"] + errors))
+        sys.exit(1)
+    print("追问按会话分别生成，独立问题照常命中回答缓存")
+
+
+if __name__ == "__main__":
+    main()
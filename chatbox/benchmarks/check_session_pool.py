@@ -0,0 +1,97 @@
+"""检查MCP连接池在借用方被取消后仍能正常借出连接
+
+用法: python benchmarks/check_session_pool.py
+
+启动一个只有一个连接的连接池（ping_interval=0，每次借用都先ping），检查
+- 健康检查期间借用方超时取消（用SIGSTOP暂停服务器进程使ping挂起）后，连接回到池中，之后的借用能正常完成；
+- 使用连接期间借用方被取消后，连接回到池中，下次借用前重新检查。
+任一检查失败时以非零状态退出。
+"""
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_client.session_pool import MCPSessionPool  # noqa: E402
+
+# 最小的MCP服务器：启动时写出自己的进程号，便于暂停
+SERVER_SCRIPT = """
+import os
+import sys
+from pathlib import Path
+
+Path(sys.argv[0]).with_suffix(".pid").write_text(str(os.getpid()))
+
+from mcp.server.fastmcp import FastMCP
+
+FastMCP("pool-check", log_level="WARNING").run()
+"""
+
+
+async def borrow(pool: MCPSessionPool, hold: float = 0.0):
+    async with pool.session() as session:
+        await session.list_tools()
+        await asyncio.sleep(hold)
+
+
+async def run(script: Path, errors: List[str]):
+    pool = MCPSessionPool.for_script(str(script), size=1, ping_interval=0, ping_timeout=2, start_timeout=30)
+    await pool.start()
+    try:
+        pid = int(script.with_suffix(".pid").read_text())
+
+        # 暂停服务器进程，借用方在ping期间超时取消
+        os.kill(pid, signal.SIGSTOP)
+        try:
+            await asyncio.wait_for(borrow(pool), timeout=0.5)
+            errors.append("服务器暂停时借用没有超时")
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            os.kill(pid, signal.SIGCONT)
+        print(f"健康检查期间取消后: {pool.stats()}")
+        if pool.stats()["idle"] != 1:
+            errors.append("健康检查期间被取消的借用没有把连接放回池中")
+
+        try:
+            await asyncio.wait_for(borrow(pool), timeout=10)
+        except asyncio.TimeoutError:
+            errors.append("健康检查期间取消借用后，再次借用连接超时")
+
+        # 使用连接期间取消
+        task = asyncio.create_task(borrow(pool, hold=10))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        print(f"使用期间取消后: {pool.stats()}")
+        if pool.stats()["idle"] != 1:
+            errors.append("使用期间被取消的借用没有把连接放回池中")
+
+        try:
+            await asyncio.wait_for(borrow(pool), timeout=10)
+        except asyncio.TimeoutError:
+            errors.append("使用期间取消借用后，再次借用连接超时")
+        print(f"最后: {pool.stats()}")
+    finally:
+        await pool.close()
+
+
+def main():
+    errors: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "pool_check_server.py"
+        script.write_text(SERVER_SCRIPT, encoding="utf-8")
+        asyncio.run(run(script, errors))
+    if errors:
+        print("\n".join(["检查失败:"] + errors))
+        sys.exit(1)
+    print("借用方被取消后连接回到池中，之后的借用正常完成")
+
+
+if __name__ == "__main__":
+    main()
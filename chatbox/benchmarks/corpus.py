@@ -0,0 +1,75 @@
+"""合成的个人资料数据集，用于基准测试"""
+import copy
+import json
+import random
+from pathlib import Path
+from typing import Any, Dict, List
+
+SAMPLE_PROFILE = Path(__file__).parent.parent / "mcp_server" / "data" / "person_profile" / "sample_profiles.json"
+
+SURNAMES = ["王", "李", "张", "刘", "陈", "杨", "赵", "黄", "周", "吴"]
+GIVEN_NAMES = ["锭云", "子涵", "浩然", "雨桐", "思远", "欣怡", "宇轩", "梓萱", "俊杰", "诗琪"]
+CITIES = ["广州", "深圳", "北京", "上海", "杭州", "成都", "武汉", "南京"]
+SKILLS = ["Python", "FastAPI", "LangChain", "Vue3", "React", "Docker", "Kubernetes", "PostgreSQL", "Redis", "Go"]
+
+
+def load_sample() -> Dict[str, Any]:
+    with open(SAMPLE_PROFILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_profile(base: Dict[str, Any], index: int, rng: random.Random) -> Dict[str, Any]:
+    """以示例资料为模板生成一份内容有差异的资料"""
+    profile = copy.deepcopy(base)
+    profile["姓名"] = rng.choice(SURNAMES) + rng.choice(GIVEN_NAMES) + str(index)
+    profile["年龄"] = rng.randint(20, 40)
+    profile["邮箱"] = f"user{index}@example.com"
+    profile.setdefault("教育背景", {})["地点"] = rng.choice(CITIES)
+    for work in profile.get("工作经历", []):
+        work["地点"] = rng.choice(CITIES)
+        work["公司"] = f"{work.get('公司', '公司')}{index}"
+    for project in profile.get("项目经历", []):
+        project["项目名称"] = f"{project.get('项目名称', '项目')}-{index}"
+        project["技术栈"] = rng.sample(SKILLS, 4)
+    profile["专业技能"] = list(profile.get("专业技能", [])) + [f"熟悉 {skill}" for skill in rng.sample(SKILLS, 3)]
+    return profile
+
+
+def generate_profiles(count: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    base = load_sample()
+    return [make_profile(base, i, rng) for i in range(count)]
+
+
+def write_corpus(directory: Path, files: int, profiles_per_file: int = 1, seed: int = 42) -> Path:
+    """写出 files 个JSON文件；profiles_per_file 大于1时每个文件是以姓名为键的多人资料"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    profiles = generate_profiles(files * profiles_per_file, seed)
+    for i in range(files):
+        chunk = profiles[i * profiles_per_file:(i + 1) * profiles_per_file]
+        data = chunk[0] if profiles_per_file == 1 else {p["姓名"]: p for p in chunk}
+        with open(directory / f"profile_{i:05d}.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    return directory
+
+
+def make_large_profile(projects: int, seed: int = 42) -> Dict[str, Any]:
+    """单人资料，工作和项目经历扩充到 projects 条，用于测试后端检索随资料规模的变化"""
+    rng = random.Random(seed)
+    profile = load_sample()
+    base_works = profile.get("工作经历", []) or [{}]
+    base_projects = profile.get("项目经历", []) or [{}]
+    profile["工作经历"] = []
+    profile["项目经历"] = []
+    for i in range(projects):
+        work = copy.deepcopy(base_works[i % len(base_works)])
+        work["公司"] = f"{work.get('公司', '公司')}{i}"
+        work["地点"] = rng.choice(CITIES)
+        profile["工作经历"].append(work)
+
+        project = copy.deepcopy(base_projects[i % len(base_projects)])
+        project["项目名称"] = f"{project.get('项目名称', '项目')}-{i}"
+        project["技术栈"] = rng.sample(SKILLS, 4)
+        profile["项目经历"].append(project)
+    return profile
@@ -0,0 +1,99 @@
+"""本地的OpenAI兼容服务器，用固定的延迟模拟LLM，供端到端基准测试使用
+
+用法: python benchmarks/fake_openai.py [--port 9100] [--latency 0.2] [--ttft 0.05] [--chunks 20]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+
+# 由命令行参数设置
+settings = {"latency": 0.2, "ttft": 0.05, "chunks": 20}
+counters = {"requests": 0}
+
+
+def estimate_prompt_tokens(messages) -> int:
+    return sum(len(str(message.get("content") or "")) for message in messages)
+
+
+def usage(messages, completion_tokens: int) -> dict:
+    prompt_tokens = estimate_prompt_tokens(messages)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def chunk(delta: dict, finish_reason=None) -> str:
+    data = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/health")
+async def health():
+    return {"status": "healthy", **counters}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    counters["requests"] += 1
+    messages = body.get("messages", [])
+    question = str(messages[-1].get("content") or "") if messages else ""
+    pieces = [f"片段{i}" for i in range(settings["chunks"])]
+    answer = f"关于「{question[:20]}」的回答：" + "".join(pieces)
+
+    if body.get("stream"):
+        async def events():
+            await asyncio.sleep(settings["ttft"])
+            yield chunk({"role": "assistant", "content": ""})
+            per_chunk = max(0.0, settings["latency"] - settings["ttft"]) / max(1, len(pieces))
+            for piece in pieces:
+                yield chunk({"content": piece})
+                await asyncio.sleep(per_chunk)
+            yield chunk({}, finish_reason="stop")
+            if (body.get("stream_options") or {}).get("include_usage"):
+                data = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": "fake", "choices": [], "usage": usage(messages, len(pieces))}
+                yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(settings["latency"])
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": usage(messages, len(pieces)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.2, help="每次请求的总耗时（秒）")
+    parser.add_argument("--ttft", type=float, default=0.05, help="流式响应的首token延迟（秒）")
+    parser.add_argument("--chunks", type=int, default=20, help="回答的片段数")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, ttft=args.ttft, chunks=args.chunks)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
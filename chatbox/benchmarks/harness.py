@@ -0,0 +1,85 @@
+"""基准测试的计时、统计和结果输出工具"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = Path(__file__).parent.parent
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """线性插值的百分位数，sorted_samples 需已排序"""
+    if not sorted_samples:
+        return 0.0
+    position = (len(sorted_samples) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_samples) - 1)
+    return sorted_samples[low] + (sorted_samples[high] - sorted_samples[low]) * (position - low)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """耗时样本（毫秒）的统计：均值、p50/p95/p99、最小和最大值"""
+    ordered = sorted(samples_ms)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.mean(ordered) if ordered else 0.0,
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "min_ms": ordered[0] if ordered else 0.0,
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """调用 fn 若干次并统计耗时，预热调用不计入结果"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境信息，便于比较不同次运行的结果"""
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def write_results(path: Optional[Path], results: Dict[str, Any]):
+    """把结果连同运行环境写成JSON，未指定路径时不输出"""
+    if path is None:
+        return
+    payload = {"environment": environment(), **results}
+    text = json.dumps(payload, ensure_ascii=False, indent=2)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+    print(f"结果已写入 {path}")
+
+
+def format_stats(label: str, stats: Dict[str, float]) -> str:
+    return (f"{label:<40} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+            f"p99 {stats['p99_ms']:9.3f} ms  mean {stats['mean_ms']:9.3f} ms")
@@ -1,19 +1,43 @@
 import argparse
-import asyncio
 import subprocess
 import sys
 import os
+import threading
+from concurrent.futures import Future
 from pathlib import Path
 
-def start_api_server():
-    """启动API服务器"""
-    print("启动王锭云个人助手API服务器...")
+# API服务器的默认配置，可通过环境变量覆盖
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+
+def start_api_server(host: str = API_HOST, port: int = API_PORT, workers: int = API_WORKERS, reload: bool = False):
+    """启动API服务器
+
+    默认为生产模式：关闭自动重载，启动 workers 个工作进程。
+    多个工作进程且未配置 STATE_STORE 时，会话和回答缓存使用共享的SQLite存储，
+    同一用户的请求可以由任意一个工作进程处理。reload 为True时为单进程的开发模式。
+    """
+    import uvicorn
+
     backend_dir = Path(__file__).parent / "backend"
-    subprocess.Popen(
-        [sys.executable, str(backend_dir / "app.py")],
-        cwd=str(backend_dir),
+    workers = 1 if reload else max(1, workers)
+    if workers > 1 and not os.getenv("STATE_STORE"):
+        # 工作进程继承环境变量，在导入 chatbox 时创建同一个共享存储
+        os.environ["STATE_STORE"] = "sqlite"
+        print("多个工作进程共享会话和回答缓存，使用SQLite存储")
+
+    print(f"启动王锭云个人助手API服务器（{'开发模式，自动重载' if reload else f'{workers}个工作进程'}）...")
+    print(f"访问 http://localhost:{port}/docs 查看API文档")
+    uvicorn.run(
+        "app:app",
+        host=host,
+        port=port,
+        workers=workers,
+        reload=reload,
+        reload_dirs=[str(backend_dir)] if reload else None,
+        app_dir=str(backend_dir),
     )
-    print("API服务器已启动，访问 http://localhost:8000/docs 查看API文档")
 
 def start_mcp_server():
     """启动MCP服务器"""
@@ -25,9 +49,29 @@ def start_mcp_server():
     )
     print("MCP服务器已启动")
 
+def load_chatbot_in_background() -> Future:
+    """在后台线程中导入后端、编译对话图并创建LLM链，返回得到聊天机器人的Future
+
+    后端依赖的langchain/langgraph导入需要约一秒，放在后台进行，提示符可以立即出现，
+    加载在用户输入第一个问题的同时完成。
+    """
+    future: Future = Future()
+    
+    def load():
+        try:
+            from backend.chatbox import get_chatbot, get_chain
+            chatbot = get_chatbot()
+            get_chain()
+            future.set_result(chatbot)
+        except BaseException as e:
+            future.set_exception(e)
+    
+    threading.Thread(target=load, name="chatbot-loader", daemon=True).start()
+    return future
+
 def start_chat_cli():
     """启动命令行聊天界面"""
-    from backend.chatbox import chatbot
+    chatbot_future = load_chatbot_in_background()
     
     print("\n=== 王锭云个人助手 ===")
     print("输入问题来了解关于王锭云的信息，输入'退出'结束对话")
@@ -42,7 +86,7 @@ def start_chat_cli():
             continue
             
         try:
-            response = chatbot.chat(user_input)
+            response = chatbot_future.result().chat(user_input)
             print(f"\n助手: {response}")
         except Exception as e:
             print(f"\n出错了: {str(e)}")
@@ -53,11 +97,15 @@ def main():
     parser.add_argument("--api", action="store_true", help="启动API服务器")
     parser.add_argument("--mcp", action="store_true", help="启动MCP服务器")
     parser.add_argument("--chat", action="store_true", help="启动命令行聊天界面")
+    parser.add_argument("--host", default=API_HOST, help="API服务器监听地址")
+    parser.add_argument("--port", type=int, default=API_PORT, help="API服务器端口")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="API服务器工作进程数，默认为CPU核数")
+    parser.add_argument("--reload", action="store_true", help="以开发模式启动API服务器（单进程，代码变化时自动重载）")
     
     args = parser.parse_args()
     
     if args.api:
-        start_api_server()
+        start_api_server(args.host, args.port, args.workers, args.reload)
     elif args.mcp:
         start_mcp_server()
     elif args.chat:
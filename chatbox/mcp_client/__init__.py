@@ -1,3 +1,4 @@
+from .session_pool import MCPSessionPool
 from .client import MCPClient
 
-__all__ = ["MCPClient"]
+__all__ = ["MCPClient", "MCPSessionPool"]
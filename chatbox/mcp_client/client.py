@@ -2,61 +2,98 @@ import asyncio
 import os
 import sys
 import json
+import time
 from typing import Optional
 from contextlib import AsyncExitStack
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp import types
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+if __package__:
+    from .session_pool import MCPSessionPool, MCP_POOL_SIZE
+else:
+    # 直接运行 python mcp_client/client.py 时没有所在的包，脚本目录已在 sys.path[0]
+    from session_pool import MCPSessionPool, MCP_POOL_SIZE
+
 load_dotenv()  # load environment variables from .env
 
+# 同一条助手消息中的工具调用最多同时执行的数量
+MCP_TOOL_CONCURRENCY = int(os.getenv("MCP_TOOL_CONCURRENCY", "4"))
+# 每轮查询最多调用模型的次数，以及所有调用合计的token预算
+MCP_MAX_STEPS = int(os.getenv("MCP_MAX_STEPS", "5"))
+MCP_MAX_TOKENS = int(os.getenv("MCP_MAX_TOKENS", "16000"))
+# 工具列表缓存的有效期（秒），为0时只在服务器通知工具变化时刷新
+MCP_TOOLS_CACHE_TTL = float(os.getenv("MCP_TOOLS_CACHE_TTL", "300"))
+
 class MCPClient:
-    def __init__(self):
+    def __init__(self, pool: Optional[MCPSessionPool] = None):
         # 检查 OpenAI API Key
         api_key = os.getenv('OPENAI_API_KEY')
-        # Initialize session and client objects
-        self.session: Optional[ClientSession] = None
+        # Initialize session pool and client objects
+        # 传入已启动的连接池时，多个客户端共享同一组服务器进程
+        self.pool = pool
         self.exit_stack = AsyncExitStack()
+        # 缓存的 OpenAI 格式工具列表，避免每次查询都请求 list_tools 并重新转换
+        self.openai_tools: Optional[list] = None
+        self.tools_fetched_at = 0.0
         
         if not api_key:
             raise ValueError("OPENAI_API_KEY 未设置。请检查 .env 文件")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = AsyncOpenAI(api_key=api_key)
+        self.tool_semaphore = asyncio.Semaphore(MCP_TOOL_CONCURRENCY)
         print("✅ OpenAI 客户端初始化完成")
 
-    async def connect_to_server(self, server_script_path: str):
-        """Connect to an MCP server"""
-        is_python = server_script_path.endswith('.py')
-        is_js = server_script_path.endswith('.js')
-        if not (is_python or is_js):
-            raise ValueError("Server script must be a .py or .js file")
-
-        command = "python" if is_python else "node"
-        server_params = StdioServerParameters(
-            command=command,
-            args=[server_script_path],
-            env=None
-        )
+    async def connect_to_server(self, server_script_path: Optional[str] = None, pool_size: int = MCP_POOL_SIZE):
+        """Connect to an MCP server
 
-        stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
-        self.stdio, self.write = stdio_transport
-        self.session = await self.exit_stack.enter_async_context(ClientSession(self.stdio, self.write))
-
-        await self.session.initialize()
+        启动 pool_size 个预热的服务器进程；构造时传入了连接池则直接使用该连接池。
+        """
+        if self.pool is None:
+            if server_script_path is None:
+                raise ValueError("未指定服务器脚本")
+            self.pool = MCPSessionPool.for_script(server_script_path, size=pool_size)
+            self.exit_stack.push_async_callback(self.pool.close)
+            await self.pool.start()
+        self.pool.add_listener(self.handle_server_message)
 
         # List available tools
-        response = await self.session.list_tools()
-        tools = response.tools
+        tools = await self.refresh_tools()
         print("\nConnected to server with tools:", [tool.name for tool in tools])
 
-    def test_api_connection(self):
+    async def handle_server_message(self, message):
+        """处理服务器主动发送的消息：工具列表变化时使缓存失效"""
+        if isinstance(message, types.ServerNotification) and isinstance(message.root, types.ToolListChangedNotification):
+            self.openai_tools = None
+
+    async def refresh_tools(self):
+        """从服务器获取工具列表并缓存转换后的 OpenAI 格式"""
+        async with self.pool.session() as session:
+            response = await session.list_tools()
+        available_tools = [{
+            "name": tool.name,
+            "description": tool.description,
+            "input_schema": tool.inputSchema
+        } for tool in response.tools]
+
+        self.openai_tools = self.convert_mcp_tools_to_openai_format(available_tools)
+        self.tools_fetched_at = time.monotonic()
+        return response.tools
+
+    async def get_openai_tools(self) -> list:
+        """返回缓存的 OpenAI 格式工具列表，缓存失效或过期时重新获取"""
+        expired = MCP_TOOLS_CACHE_TTL > 0 and time.monotonic() - self.tools_fetched_at > MCP_TOOLS_CACHE_TTL
+        if self.openai_tools is None or expired:
+            await self.refresh_tools()
+        return self.openai_tools
+
+    async def test_api_connection(self):
         """测试 OpenAI API 连接"""
         print("\n=== 测试 OpenAI API 连接 ===")
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=[{"role": "user", "content": "Hi"}],
                 max_tokens=10
@@ -94,51 +131,98 @@ class MCPClient:
             
         return openai_tools
 
+    @staticmethod
+    def parse_tool_args(tool_call) -> dict:
+        """解析工具调用的参数"""
+        try:
+            return json.loads(tool_call.function.arguments)
+        except json.JSONDecodeError as e:
+            print(f"JSON 解析错误: {e}")
+            print(f"原始参数: {tool_call.function.arguments}")
+            return {}
+
+    async def run_tool(self, tool_name: str, tool_args: dict) -> str:
+        """执行一个工具调用并返回结果文本，并发数量受 tool_semaphore 限制"""
+        # 调用 MCP 工具
+        try:
+            async with self.tool_semaphore, self.pool.session() as session:
+                result = await session.call_tool(tool_name, tool_args)
+            tool_result = result.content
+            print(f"工具返回结果: {tool_result}")
+            return str(tool_result)
+            
+        except Exception as e:
+            error_msg = f"工具调用失败: {str(e)}"
+            print(f"❌ {error_msg}")
+            return error_msg
+
+    @staticmethod
+    def tool_call_key(tool_name: str, tool_args: dict) -> str:
+        """工具调用的去重键：工具名 + 规范化的参数"""
+        return f"{tool_name}:{json.dumps(tool_args, ensure_ascii=False, sort_keys=True)}"
+
     async def process_query(self, query: str) -> str:
-        """Process a query using OpenAI and available tools"""
+        """Process a query using OpenAI and available tools
+
+        循环调用模型并执行其请求的工具，直到模型不再调用工具，或达到步数/token预算。
+        同一轮查询中参数相同的工具调用只执行一次。
+        """
         try:
             messages = [{"role": "user", "content": query}]
 
-            response = await self.session.list_tools()
-            available_tools = [{
-                "name": tool.name,
-                "description": tool.description,
-                "input_schema": tool.inputSchema
-            } for tool in response.tools]
-
-            # 转换为 OpenAI 格式
-            openai_tools = self.convert_mcp_tools_to_openai_format(available_tools)
+            # OpenAI 格式的工具列表（已缓存）
+            openai_tools = await self.get_openai_tools()
             
             print(f"发送请求到 OpenAI API...")
             print(f"可用工具数量: {len(openai_tools)}")
             
-            # 如果没有工具，不传递 tools 参数
-            if not openai_tools:
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    max_tokens=1000
-                )
-            else:
-                # 调用 OpenAI API (带工具) - 注意：这是同步调用，不需要 await
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=messages,
-                    tools=openai_tools,
-                    tool_choice="auto",
-                    max_tokens=1000
-                )
-
-            # 处理响应
             final_text = []
-            assistant_message = response.choices[0].message
-            
-            # 添加助手的文本回复
-            if assistant_message.content:
-                final_text.append(assistant_message.content)
-            
-            # 处理工具调用
-            if assistant_message.tool_calls:
+            # 本轮查询中已执行（或正在执行）的工具调用，键为 tool_call_key
+            tool_results = {}
+            tokens_used = 0
+
+            for step in range(MCP_MAX_STEPS):
+                remaining_tokens = MCP_MAX_TOKENS - tokens_used
+                if remaining_tokens <= 0:
+                    print(f"已用完本轮查询的token预算: {tokens_used}")
+                    final_text.append("[已达到token预算上限，回答可能不完整]")
+                    break
+
+                request = {
+                    "model": "gpt-4o-mini",
+                    "messages": messages,
+                    "max_tokens": min(1000, remaining_tokens),
+                }
+                # 如果没有工具，不传递 tools 参数；最后一步不再允许调用工具，要求模型直接回答
+                if openai_tools:
+                    request["tools"] = openai_tools
+                    request["tool_choice"] = "none" if step == MCP_MAX_STEPS - 1 else "auto"
+
+                # 调用 OpenAI API，第一步出错时直接抛出，之后出错时保留已有的结果
+                if step == 0:
+                    response = await self.client.chat.completions.create(**request)
+                else:
+                    try:
+                        response = await self.client.chat.completions.create(**request)
+                    except Exception as e:
+                        print(f"获取最终回复时出错: {e}")
+                        final_text.append("获取最终回复时出错")
+                        break
+
+                if response.usage:
+                    tokens_used += response.usage.total_tokens
+
+                # 处理响应
+                assistant_message = response.choices[0].message
+                
+                # 添加助手的文本回复
+                if assistant_message.content:
+                    final_text.append(assistant_message.content)
+                
+                # 模型不再调用工具，得到最终回复
+                if not assistant_message.tool_calls:
+                    break
+
                 # 添加助手消息到对话历史
                 messages.append({
                     "role": "assistant",
@@ -155,56 +239,30 @@ class MCPClient:
                     ]
                 })
                 
-                # 执行每个工具调用
+                # 并发执行这条消息中的工具调用，重复的调用复用同一个结果
+                keys = []
                 for tool_call in assistant_message.tool_calls:
                     tool_name = tool_call.function.name
-                    try:
-                        tool_args = json.loads(tool_call.function.arguments)
-                    except json.JSONDecodeError as e:
-                        print(f"JSON 解析错误: {e}")
-                        print(f"原始参数: {tool_call.function.arguments}")
-                        tool_args = {}
+                    tool_args = self.parse_tool_args(tool_call)
+                    key = self.tool_call_key(tool_name, tool_args)
+                    keys.append(key)
                     
+                    if key in tool_results:
+                        print(f"复用工具结果: {tool_name}，参数: {tool_args}")
+                        continue
                     print(f"调用工具: {tool_name}，参数: {tool_args}")
                     final_text.append(f"[调用工具 {tool_name}，参数: {tool_args}]")
-                    
-                    # 调用 MCP 工具 - 这是异步调用，需要 await
-                    try:
-                        result = await self.session.call_tool(tool_name, tool_args)
-                        tool_result = result.content
-                        print(f"工具返回结果: {tool_result}")
-                        
-                        # 添加工具结果到对话历史
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": str(tool_result)
-                        })
-                        
-                    except Exception as e:
-                        error_msg = f"工具调用失败: {str(e)}"
-                        print(f"❌ {error_msg}")
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "content": error_msg
-                        })
+                    tool_results[key] = asyncio.ensure_future(self.run_tool(tool_name, tool_args))
                 
-                # 获取最终回复 - 同步调用，不需要 await
-                try:
-                    final_response = self.client.chat.completions.create(
-                        model="gpt-4o-mini",
-                        messages=messages,
-                        tools=openai_tools,
-                        tool_choice="auto",
-                        max_tokens=1000
-                    )
-                    
-                    if final_response.choices[0].message.content:
-                        final_text.append(final_response.choices[0].message.content)
-                except Exception as e:
-                    print(f"获取最终回复时出错: {e}")
-                    final_text.append("获取最终回复时出错")
+                # 结果按 tool_calls 的顺序加入对话历史
+                contents = await asyncio.gather(*(tool_results[key] for key in keys))
+                messages.extend(
+                    {
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "content": content
+                    } for tool_call, content in zip(assistant_message.tool_calls, contents)
+                )
 
             return "\n".join(final_text)
             
@@ -220,7 +278,7 @@ class MCPClient:
         print("\nMCP Client Started!")
         
         # 首先测试 API 连接
-        if not self.test_api_connection():
+        if not await self.test_api_connection():
             print("API 连接失败，无法继续。请检查 API Key 和网络连接。")
             return
             
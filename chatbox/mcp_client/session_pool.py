@@ -0,0 +1,216 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+# 连接池配置，可通过环境变量覆盖
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+# 连接空闲超过该时间（秒）后，取出时先发送ping检查健康状态
+MCP_POOL_PING_INTERVAL = float(os.getenv("MCP_POOL_PING_INTERVAL", "30"))
+MCP_POOL_PING_TIMEOUT = float(os.getenv("MCP_POOL_PING_TIMEOUT", "5"))
+MCP_POOL_START_TIMEOUT = float(os.getenv("MCP_POOL_START_TIMEOUT", "60"))
+
+MessageHandler = Callable[[object], Awaitable[None]]
+
+
+def server_environment() -> Dict[str, str]:
+    """传给服务器进程的环境变量
+
+    stdio_client 默认只继承 PATH、HOME 等少数变量，这里显式传入全部 MCP_* 配置（包括从 .env 加载的），
+    使服务器的日志、结果大小等设置与客户端进程一致。
+    """
+    return {key: value for key, value in os.environ.items() if key.startswith("MCP_")}
+
+
+class PooledSession:
+    """池中的一个服务器进程及其 ClientSession
+
+    stdio_client 和 ClientSession 内部使用 anyio 的 cancel scope，必须在同一个任务中进入和退出，
+    所以每个连接由一个独立的后台任务持有，关闭时通知该任务退出。
+    """
+
+    def __init__(self):
+        self.session: Optional[ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+        self.ready = asyncio.Event()
+        self.closing = asyncio.Event()
+        # 为0表示下次取出时必须先检查健康状态
+        self.last_used = 0.0
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self.task is not None and not self.task.done()
+
+
+class MCPSessionPool:
+    """预热的 MCP 服务器连接池
+
+    启动时创建 size 个服务器进程并完成初始化（包括加载和索引资料数据），
+    并发的查询从池中借用连接，用完归还。借出前对空闲较久的连接发送ping，
+    连接失效时重启对应的服务器进程。
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = MCP_POOL_SIZE,
+        ping_interval: float = MCP_POOL_PING_INTERVAL,
+        ping_timeout: float = MCP_POOL_PING_TIMEOUT,
+        start_timeout: float = MCP_POOL_START_TIMEOUT,
+    ):
+        self.server_params = server_params
+        self.size = max(1, size)
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.start_timeout = start_timeout
+        self._connections: List[PooledSession] = []
+        self._idle: "asyncio.Queue[PooledSession]" = asyncio.Queue()
+        self._listeners: List[MessageHandler] = []
+        self.restarts = 0
+        self.pings = 0
+
+    @classmethod
+    def for_script(cls, server_script_path: str, size: int = MCP_POOL_SIZE, **kwargs) -> "MCPSessionPool":
+        """为 .py 或 .js 服务器脚本创建连接池"""
+        is_python = server_script_path.endswith('.py')
+        is_js = server_script_path.endswith('.js')
+        if not (is_python or is_js):
+            raise ValueError("Server script must be a .py or .js file")
+
+        server_params = StdioServerParameters(
+            command="python" if is_python else "node",
+            args=[server_script_path],
+            env=server_environment()
+        )
+        return cls(server_params, size=size, **kwargs)
+
+    def add_listener(self, handler: MessageHandler):
+        """注册服务器主动消息（如工具列表变化通知）的处理函数"""
+        self._listeners.append(handler)
+
+    async def _handle_message(self, message):
+        for handler in self._listeners:
+            await handler(message)
+
+    async def start(self):
+        """并行启动所有服务器进程，任一进程启动失败时关闭已启动的进程"""
+        try:
+            results = await asyncio.gather(*(self._spawn() for _ in range(self.size)), return_exceptions=True)
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+        except BaseException:
+            await self.close()
+            raise
+        for conn in results:
+            self._idle.put_nowait(conn)
+
+    async def _spawn(self) -> PooledSession:
+        conn = PooledSession()
+        conn.task = asyncio.create_task(self._run(conn))
+        # 启动前就登记，与启动并发的 close() 也能关闭该进程
+        self._connections.append(conn)
+        ready = asyncio.create_task(conn.ready.wait())
+        try:
+            await asyncio.wait({ready, conn.task}, timeout=self.start_timeout, return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            # 等待期间被取消时关闭正在启动的进程
+            await self._stop(conn)
+            raise
+        finally:
+            ready.cancel()
+
+        if not conn.alive:
+            await self._stop(conn)
+            raise RuntimeError("MCP 服务器启动失败")
+        conn.last_used = time.monotonic()
+        return conn
+
+    async def _run(self, conn: PooledSession):
+        """持有一个服务器连接，直到收到关闭通知"""
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write, message_handler=self._handle_message) as session:
+                    await session.initialize()
+                    conn.session = session
+                    conn.ready.set()
+                    await conn.closing.wait()
+        finally:
+            conn.session = None
+
+    async def _stop(self, conn: PooledSession):
+        conn.closing.set()
+        if conn in self._connections:
+            self._connections.remove(conn)
+        if conn.task is None:
+            return
+        if not conn.ready.is_set():
+            # 还没有完成初始化，不会等待关闭通知，直接取消
+            conn.task.cancel()
+        # 用 asyncio.wait 等待：持有连接的任务被取消时不会把 CancelledError 传给调用方
+        done, _ = await asyncio.wait({conn.task}, timeout=self.ping_timeout)
+        if not done:
+            conn.task.cancel()
+            print("关闭 MCP 服务器连接超时")
+        elif not conn.task.cancelled() and conn.task.exception() is not None:
+            print(f"关闭 MCP 服务器连接时出错: {conn.task.exception()}")
+
+    async def _ensure_healthy(self, conn: PooledSession) -> PooledSession:
+        """返回可用的连接：最近用过的直接返回，空闲较久的先ping，失效的重启"""
+        if conn.alive:
+            if time.monotonic() - conn.last_used < self.ping_interval:
+                return conn
+            try:
+                self.pings += 1
+                await asyncio.wait_for(conn.session.send_ping(), timeout=self.ping_timeout)
+                return conn
+            except Exception as e:
+                print(f"MCP 服务器连接健康检查失败: {e!r}")
+
+        print("重启 MCP 服务器连接...")
+        await self._stop(conn)
+        self.restarts += 1
+        return await self._spawn()
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        """借用一个连接，没有空闲连接时等待"""
+        conn = await self._idle.get()
+        try:
+            conn = await self._ensure_healthy(conn)
+        except BaseException:
+            # 重启失败或借用方在检查期间被取消（如客户端断开、wait_for超时）时把连接放回池中，
+            # 下次借用时再检查，否则池中的连接会越来越少，直到所有查询都在等待空闲连接
+            conn.last_used = 0.0
+            self._idle.put_nowait(conn)
+            raise
+
+        try:
+            yield conn.session
+            conn.last_used = time.monotonic()
+        except BaseException:
+            # 调用出错或被取消时连接可能已失效，下次借用前先检查
+            conn.last_used = 0.0
+            raise
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def close(self):
+        """关闭所有服务器进程"""
+        await asyncio.gather(*(self._stop(conn) for conn in list(self._connections)))
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def stats(self) -> dict:
+        """连接池统计"""
+        return {
+            "size": self.size,
+            "alive": sum(1 for conn in self._connections if conn.alive),
+            "idle": self._idle.qsize(),
+            "restarts": self.restarts,
+            "pings": self.pings,
+        }
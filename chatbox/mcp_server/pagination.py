@@ -0,0 +1,67 @@
+import base64
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# 截断后的预览中最多列出的键数和字符数
+PREVIEW_KEYS = 20
+PREVIEW_CHARS = 200
+
+
+def encode_cursor(offset: int, version: int) -> str:
+    """游标记录下一页的起始位置和数据版本，对调用方不透明"""
+    raw = json.dumps({"o": offset, "v": version}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[int, Optional[int]]:
+    """解析游标，返回 (起始位置, 数据版本)；没有游标时从头开始"""
+    if not cursor:
+        return 0, None
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return max(0, int(raw["o"])), int(raw["v"])
+    except Exception:
+        raise ValueError(f"无效的游标: {cursor}")
+
+
+def preview(value: Any) -> Any:
+    """超出字节上限的值只返回结构预览"""
+    if isinstance(value, dict):
+        return {"_truncated": True, "keys": list(value.keys())[:PREVIEW_KEYS], "size": len(value)}
+    if isinstance(value, list):
+        return {"_truncated": True, "length": len(value)}
+    text = str(value)
+    if len(text) > PREVIEW_CHARS:
+        return text[:PREVIEW_CHARS] + "…"
+    return value
+
+
+def byte_size(text: str) -> int:
+    return len(text.encode("utf-8"))
+
+
+@dataclass
+class PageInfo:
+    """一页结果的分页信息，结果不完整时随工具返回内容一起发给调用方"""
+    total: int
+    returned: int
+    offset: int = 0
+    next_cursor: Optional[str] = None
+    truncated_paths: List[str] = field(default_factory=list)
+
+    @property
+    def complete(self) -> bool:
+        return self.next_cursor is None and not self.truncated_paths
+
+    def to_dict(self) -> Dict[str, Any]:
+        info: Dict[str, Any] = {"total": self.total, "returned": self.returned}
+        hints = []
+        if self.next_cursor is not None:
+            info["next_cursor"] = self.next_cursor
+            hints.append(f"还有 {self.total - self.offset - self.returned} 条结果，传入 cursor 参数获取下一页")
+        if self.truncated_paths:
+            info["truncated_paths"] = self.truncated_paths
+            hints.append("部分内容超出 max_bytes 已被截断，可用 get_profile_by_file 或更具体的查询获取完整内容")
+        info["hint"] = "；".join(hints)
+        return info
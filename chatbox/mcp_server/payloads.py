@@ -0,0 +1,64 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Tuple
+
+COMPACT_SEPARATORS = (",", ":")
+
+
+def dump_json(obj: Any, compact: bool = False) -> str:
+    """工具返回内容的JSON序列化：默认缩进2格，compact 为真时去掉所有空白"""
+    if compact:
+        return json.dumps(obj, ensure_ascii=False, separators=COMPACT_SEPARATORS)
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+@dataclass(frozen=True)
+class Payload:
+    """同一个JSON值的两种序列化结果"""
+    pretty: str
+    compact: str
+    # UTF-8字节数，分页时用于判断是否超出 max_bytes
+    pretty_bytes: int = field(init=False)
+    compact_bytes: int = field(init=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "pretty_bytes", len(self.pretty.encode("utf-8")))
+        object.__setattr__(self, "compact_bytes", len(self.compact.encode("utf-8")))
+
+    @classmethod
+    def encode(cls, obj: Any) -> "Payload":
+        return cls(pretty=dump_json(obj), compact=dump_json(obj, compact=True))
+
+    def text(self, compact: bool = False) -> str:
+        return self.compact if compact else self.pretty
+
+    def size(self, compact: bool = False) -> int:
+        return self.compact_bytes if compact else self.pretty_bytes
+
+
+def join_object(items: Iterable[Tuple[str, Payload]]) -> Payload:
+    """把已序列化的值拼成一个JSON对象，结果与直接 json.dumps 整个字典相同
+
+    JSON字符串中的换行都会被转义，所以缩进格式下把值的每一行多缩进一层即可嵌套。
+    """
+    pretty, compact = [], []
+    for key, payload in items:
+        key_text = json.dumps(key, ensure_ascii=False)
+        nested = payload.pretty.replace("\n", "\n  ")
+        pretty.append(f"  {key_text}: {nested}")
+        compact.append(f"{key_text}:{payload.compact}")
+    if not pretty:
+        return Payload(pretty="{}", compact="{}")
+    return Payload(pretty="{\n" + ",\n".join(pretty) + "\n}", compact="{" + ",".join(compact) + "}")
+
+
+def merge_objects(payloads: Iterable[Payload]) -> Payload:
+    """合并多个已序列化的非空JSON对象（键互不重复），结果与先合并字典再 json.dumps 相同"""
+    pretty, compact = [], []
+    for payload in payloads:
+        # 去掉外层的 "{\n" 和 "\n}"，以及紧凑格式的 "{" 和 "}"
+        pretty.append(payload.pretty[2:-2])
+        compact.append(payload.compact[1:-1])
+    if not pretty:
+        return Payload(pretty="{}", compact="{}")
+    return Payload(pretty="{\n" + ",\n".join(pretty) + "\n}", compact="{" + ",".join(compact) + "}")
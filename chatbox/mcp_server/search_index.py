@@ -0,0 +1,126 @@
+import heapq
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+
+def ngrams(text: str) -> Set[str]:
+    """文本的单字和双字n-gram
+
+    中文没有空格分词，按字切分的n-gram可以覆盖任意子串查询：
+    查询的所有双字n-gram都出现在某个节点中，是该节点包含查询的必要条件。
+    """
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(query: str) -> Set[str]:
+    """查询使用的n-gram：长度不小于2时只用双字n-gram，候选集合更小"""
+    if len(query) < 2:
+        return {query} if query else set()
+    return {query[i:i + 2] for i in range(len(query) - 1)}
+
+
+@dataclass
+class IndexNode:
+    """可被搜索命中的一个位置：键名或标量值"""
+    path: str
+    value: Any
+    text: str
+    is_key: bool
+
+
+def iter_nodes(data: Any, path: str = "") -> Iterator[IndexNode]:
+    """遍历JSON，产出所有键名节点和标量值节点"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            current_path = f"{path}.{key}" if path else key
+            yield IndexNode(current_path, value, str(key).lower(), True)
+            yield from iter_nodes(value, current_path)
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            yield from iter_nodes(item, f"{path}[{i}]" if path else f"[{i}]")
+    elif data is not None:
+        yield IndexNode(path or "root", data, str(data).lower(), False)
+
+
+@dataclass
+class FileIndex:
+    """单个数据文件的倒排索引"""
+    nodes: List[IndexNode] = field(default_factory=list)
+    postings: Dict[str, Set[int]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, data: Any) -> "FileIndex":
+        index = cls()
+        for node_id, node in enumerate(iter_nodes(data)):
+            index.nodes.append(node)
+            for gram in ngrams(node.text):
+                index.postings.setdefault(gram, set()).add(node_id)
+        return index
+
+    def candidates(self, query: str) -> Set[int]:
+        """包含查询所有n-gram的节点，从最短的倒排列表开始求交集"""
+        posting_lists = []
+        for gram in query_grams(query):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            posting_lists.append(posting)
+        if not posting_lists:
+            return set()
+
+        posting_lists.sort(key=len)
+        result = set(posting_lists[0])
+        for posting in posting_lists[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+
+def score(query: str, node: IndexNode) -> float:
+    """相关度：完全匹配 > 键名匹配 > 查询在文本中占比高"""
+    value = len(query) / len(node.text)
+    if node.text == query:
+        value += 2.0
+    if node.is_key:
+        value += 1.0
+    return value
+
+
+class SearchIndex:
+    """所有已加载数据文件的倒排索引，按文件分别维护"""
+
+    def __init__(self):
+        self.files: Dict[str, FileIndex] = {}
+
+    def add_file(self, file_id: str, data: Any):
+        self.files[file_id] = FileIndex.build(data)
+
+    def remove_file(self, file_id: str):
+        self.files.pop(file_id, None)
+
+    def copy(self) -> "SearchIndex":
+        """浅拷贝：各文件的索引构建后不再修改，可以在新旧索引间共享"""
+        index = SearchIndex()
+        index.files = dict(self.files)
+        return index
+
+    def search(self, query: str, top_k: int = 50) -> List[Tuple[float, str, IndexNode]]:
+        """返回按相关度排序的前 top_k 个 (得分, 文件ID, 节点)，同一路径只保留得分最高的一次"""
+        query = query.lower()
+        best: Dict[Tuple[str, str], Tuple[float, int, int, str, IndexNode]] = {}
+        for file_pos, (file_id, file_index) in enumerate(self.files.items()):
+            for node_id in file_index.candidates(query):
+                node = file_index.nodes[node_id]
+                if query not in node.text:
+                    continue
+                hit = (score(query, node), file_pos, node_id, file_id, node)
+                key = (file_id, node.path)
+                if key not in best or hit[0] > best[key][0]:
+                    best[key] = hit
+
+        # 得分相同时按文件加载顺序和文档内顺序排列，保证结果稳定
+        top = heapq.nsmallest(top_k, best.values(), key=lambda hit: (-hit[0], hit[1], hit[2]))
+        return [(hit[0], hit[3], hit[4]) for hit in top]
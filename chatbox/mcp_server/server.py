@@ -1,23 +1,78 @@
 import json
 import asyncio
 import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp import types
 import logging
 
-logging.basicConfig(level=logging.INFO)
+from pagination import PageInfo, byte_size, decode_cursor, encode_cursor, preview
+from payloads import Payload, dump_json, join_object, merge_objects
+from search_index import SearchIndex
+
+logging.basicConfig(level=os.getenv("MCP_LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# 请求级日志的采样率（0~1），WARNING及以上级别不采样
+LOG_SAMPLE_RATE = float(os.getenv("MCP_LOG_SAMPLE_RATE", "1.0"))
+# 数据目录的轮询间隔（秒），为0时不自动重新加载
+RELOAD_INTERVAL = float(os.getenv("MCP_RELOAD_INTERVAL", "2"))
+# 为真时在DEBUG级别输出完整的工具返回内容
+DEBUG_PAYLOADS = os.getenv("MCP_DEBUG_PAYLOADS", "").lower() in ("1", "true", "yes")
+# 为真时工具默认返回不带缩进的紧凑JSON，减少模型需要读取的token；调用时可用 compact 参数覆盖
+COMPACT_JSON = os.getenv("MCP_COMPACT_JSON", "").lower() in ("1", "true", "yes")
+# 每页默认返回的结果数和字节上限（0表示不限制），调用时可用 max_results/max_bytes 参数覆盖
+MAX_RESULTS = int(os.getenv("MCP_MAX_RESULTS", "20"))
+MAX_BYTES = int(os.getenv("MCP_MAX_BYTES", "32768"))
+
+def log_event(level: int, event: str, **fields):
+    """结构化的请求级日志：先判断级别和采样，命中后才格式化字段"""
+    if not logger.isEnabledFor(level):
+        return
+    if level < logging.WARNING and LOG_SAMPLE_RATE < 1.0 and random.random() >= LOG_SAMPLE_RATE:
+        return
+    logger.log(level, "%s %s", event, " ".join(f"{key}={value!r}" for key, value in fields.items()))
+
+def log_payload(label: str, payload: Any):
+    """完整的返回内容只在开启 MCP_DEBUG_PAYLOADS 且为DEBUG级别时输出"""
+    if DEBUG_PAYLOADS and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("%s: %s", label, payload)
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    """某一时刻加载的全部数据及其索引，重新加载时整体替换"""
+    data: Dict[str, Any] = field(default_factory=dict)
+    index: SearchIndex = field(default_factory=SearchIndex)
+    # file_id -> (mtime_ns, size)，用于判断文件是否变化
+    file_stats: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    version: int = 0
+    # 预先序列化的工具返回内容：file_id -> {file_id: 内容}，以及全部数据
+    file_payloads: Dict[str, Payload] = field(default_factory=dict)
+    all_payload: Payload = field(default_factory=lambda: merge_objects([]))
+
 class DataManager:
-    def __init__(self):
-        self.data_dir = Path(__file__).parent / "data" / "person_profile"
-        self.data = {}
+    def __init__(self, data_dir: Path = None):
+        self.data_dir = Path(data_dir) if data_dir else Path(__file__).parent / "data" / "person_profile"
+        # 请求开始时取一次快照，重新加载只替换引用，正在处理的请求看到的数据保持一致
+        self.snapshot = DataSnapshot()
+        self._reload_lock = threading.Lock()
         self.load_json_data()
 
+    @property
+    def data(self) -> Dict[str, Any]:
+        return self.snapshot.data
+
+    @property
+    def index(self) -> SearchIndex:
+        return self.snapshot.index
+
     def load_json_data(self):
         """从data/person_profile目录加载所有JSON文件"""
         try:
@@ -34,24 +89,118 @@ class DataManager:
                 self.create_sample_data()
                 return
 
+            self.refresh(json_files)
+                    
+        except Exception as e:
+            logger.error(f"扫描目录错误: {e}")
+
+    def refresh(self, json_files: List[Path] = None) -> bool:
+        """增量重新加载：只解析新增或修改过的文件，移除已删除的文件，然后原子替换快照
+
+        返回数据是否有变化。只有数据确实变化时才增加快照版本，解析失败或内容未变的文件
+        只记录其mtime，不会使未完成的分页游标失效。
+        """
+        with self._reload_lock:
+            old = self.snapshot
+            if json_files is None:
+                json_files = list(self.data_dir.glob("*.json")) if self.data_dir.exists() else []
+
+            current = {}
             for json_file in json_files:
+                try:
+                    stat = json_file.stat()
+                except OSError:
+                    continue
+                current[json_file.stem] = (json_file, (stat.st_mtime_ns, stat.st_size))
+
+            changed = [file_id for file_id, (_, stat_key) in current.items() if old.file_stats.get(file_id) != stat_key]
+            removed = [file_id for file_id in old.file_stats if file_id not in current]
+            if not changed and not removed:
+                return False
+
+            data = dict(old.data)
+            index = old.index.copy()
+            file_stats = dict(old.file_stats)
+            # 未变化文件的序列化结果直接复用
+            file_payloads = dict(old.file_payloads)
+
+            for file_id in removed:
+                data.pop(file_id, None)
+                index.remove_file(file_id)
+                file_stats.pop(file_id, None)
+                file_payloads.pop(file_id, None)
+                logger.info("数据文件已删除: %s.json", file_id)
+
+            loaded = []
+            for file_id in changed:
+                json_file, stat_key = current[file_id]
+                # 解析失败时也记录mtime，避免每次轮询重复报错；已加载的旧数据继续保留
+                file_stats[file_id] = stat_key
                 try:
                     with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
+                        content = json.load(f)
+                    if file_id in data and data[file_id] == content:
+                        # 只是mtime变化（如touch、原样保存），内容没有变
+                        continue
                     
-                    file_id = json_file.stem
-                    self.data[file_id] = data
-                    logger.info(f"成功加载数据文件: {json_file.name}")
+                    file_payloads[file_id] = join_object([(file_id, Payload.encode(content))])
+                    data[file_id] = content
+                    index.add_file(file_id, content)
+                    loaded.append(file_id)
+                    logger.info("成功加载数据文件: %s", json_file.name)
                     # 打印文件内容概要
-                    logger.info(f"文件 {json_file.name} 包含的顶级键: {list(data.keys()) if isinstance(data, dict) else 'non-dict data'}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("文件 %s 包含的顶级键: %s", json_file.name, list(content.keys()) if isinstance(content, dict) else 'non-dict data')
                     
                 except json.JSONDecodeError as e:
                     logger.error(f"JSON解析错误文件 {json_file}: {e}")
                 except Exception as e:
                     logger.error(f"加载文件错误 {json_file}: {e}")
-                    
+
+            if not loaded and not any(file_id in old.data for file_id in removed):
+                # 数据没有变化，保留原来的版本，只更新记录的mtime
+                self.snapshot = replace(old, file_stats=file_stats)
+                return False
+
+            self.snapshot = DataSnapshot(
+                data=data,
+                index=index,
+                file_stats=file_stats,
+                version=old.version + 1,
+                file_payloads=file_payloads,
+                all_payload=merge_objects(file_payloads[file_id] for file_id in data),
+            )
+            log_event(logging.INFO, "reload", version=self.snapshot.version, changed=len(loaded),
+                      removed=len(removed), files=len(data))
+            return True
+
+    async def watch(self, interval: float = None):
+        """监听数据目录并增量重新加载
+
+        安装了 watchfiles 时使用文件系统事件，否则每隔 interval 秒轮询一次文件的mtime。
+        """
+        interval = RELOAD_INTERVAL if interval is None else interval
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            awatch = None
+
+        if awatch is not None and self.data_dir.exists():
+            logger.info("使用文件系统事件监听数据目录: %s", self.data_dir)
+            async for _ in awatch(self.data_dir):
+                await self._refresh_in_thread()
+        else:
+            logger.info("每 %s 秒轮询数据目录: %s", interval, self.data_dir)
+            while True:
+                await asyncio.sleep(interval)
+                await self._refresh_in_thread()
+
+    async def _refresh_in_thread(self):
+        """在线程中解析文件，不阻塞处理请求的事件循环"""
+        try:
+            await asyncio.to_thread(self.refresh)
         except Exception as e:
-            logger.error(f"扫描目录错误: {e}")
+            logger.error(f"重新加载数据时出错: {e}")
 
     def create_sample_data(self):
         """创建示例数据文件"""
@@ -80,102 +229,118 @@ class DataManager:
             logger.info(f"已创建示例数据文件: {sample_file}")
             
             # 重新加载数据
-            self.data["sample_profiles"] = sample_data
+            self.refresh()
             
         except Exception as e:
             logger.error(f"创建示例数据时出错: {e}")
 
-    async def search_content(self, query: str) -> Dict[str, Any]:
-        """在所有加载的数据中搜索相关信息"""
+    async def search_content(self, query: str, top_k: int = 50) -> Dict[str, Any]:
+        """在所有加载的数据中搜索相关信息，按相关度返回前 top_k 个匹配"""
+        results, _ = await self.search_page(query, top_k, max_results=top_k, max_bytes=0)
+        return results
+
+    async def search_page(self, query: str, top_k: int = 50, cursor: str = None,
+                          max_results: int = MAX_RESULTS, max_bytes: int = MAX_BYTES) -> Tuple[Dict[str, Any], PageInfo]:
+        """按相关度分页返回搜索结果
+
+        每页最多 max_results 个匹配、约 max_bytes 字节；单个匹配（如命中键名时的整个子树）
+        超出字节上限时只返回结构预览，并在分页信息中列出被截断的路径。
+        """
         results = {}
-        query_lower = query.lower()
-        
-        logger.info(f"开始搜索查询: '{query}'")
-        logger.info(f"当前加载的数据文件: {list(self.data.keys())}")
+        start = time.perf_counter()
+        snapshot = self.snapshot
+        offset = self._cursor_offset(cursor, snapshot)
         
-        for file_id, content in self.data.items():
-            logger.info(f"正在搜索文件: {file_id}")
-            matching_sections = {}
+        hits = snapshot.index.search(query, top_k)
+        page = PageInfo(total=len(hits), returned=0, offset=offset)
+        used_bytes = 0
+        for _, file_id, node in hits[offset:offset + max(1, max_results)]:
+            value = node.value
+            size = byte_size(node.path) + byte_size(dump_json(value, compact=True))
+            if max_bytes and used_bytes + size > max_bytes:
+                # 本页已有结果时留到下一页；本页第一个匹配就超出时截断
+                if page.returned:
+                    break
+                value = preview(value)
+                size = byte_size(node.path) + byte_size(dump_json(value, compact=True))
+                page.truncated_paths.append(f"{file_id}:{node.path}")
 
-            def search_in_data(data, path=""):
-                matches = {}
-                try:
-                    if isinstance(data, dict):
-                        for key, value in data.items():
-                            current_path = f"{path}.{key}" if path else key
-                            
-                            # 检查键名是否匹配
-                            if query_lower in str(key).lower():
-                                matches[current_path] = value
-                                logger.info(f"匹配键名: {current_path}")
-                            
-                            # 检查值是否匹配
-                            if isinstance(value, (str, int, float)):
-                                if query_lower in str(value).lower():
-                                    matches[current_path] = value
-                                    logger.info(f"匹配值: {current_path} = {value}")
-                            elif isinstance(value, list):
-                                # 搜索列表中的每个元素
-                                for i, item in enumerate(value):
-                                    if query_lower in str(item).lower():
-                                        matches[f"{current_path}[{i}]"] = item
-                                        logger.info(f"匹配列表项: {current_path}[{i}] = {item}")
-                            
-                            # 递归搜索嵌套结构
-                            nested_matches = search_in_data(value, current_path)
-                            matches.update(nested_matches)
-                    
-                    elif isinstance(data, list):
-                        for i, item in enumerate(data):
-                            current_path = f"{path}[{i}]" if path else f"[{i}]"
-                            if query_lower in str(item).lower():
-                                matches[current_path] = item
-                                logger.info(f"匹配列表项: {current_path} = {item}")
-                            nested_matches = search_in_data(item, current_path)
-                            matches.update(nested_matches)
-                    
-                    else:
-                        # 对于其他类型的数据，直接转换为字符串搜索
-                        if query_lower in str(data).lower():
-                            matches[path or "root"] = data
-                            logger.info(f"匹配数据: {path or 'root'} = {data}")
-                
-                except Exception as e:
-                    logger.error(f"搜索数据时出错 (path: {path}): {e}")
-                
-                return matches
-            
-            matching_sections = search_in_data(content)
-            if matching_sections:
+            if file_id not in results:
                 results[file_id] = {
                     "file_name": f"{file_id}.json",
-                    "matching_content": matching_sections
+                    "matching_content": {}
                 }
-                logger.info(f"文件 {file_id} 中找到 {len(matching_sections)} 个匹配项")
-            else:
-                logger.info(f"文件 {file_id} 中未找到匹配项")
+            results[file_id]["matching_content"][node.path] = value
+            used_bytes += size
+            page.returned += 1
+
+        if offset + page.returned < len(hits):
+            page.next_cursor = encode_cursor(offset + page.returned, snapshot.version)
         
-        logger.info(f"搜索查询 '{query}' 得到 {len(results)} 个结果。")
-        return results
+        log_event(logging.INFO, "search", query=query, matches=len(hits), offset=offset, returned=page.returned,
+                  files=len(results), elapsed_ms=round((time.perf_counter() - start) * 1000, 3))
+        return results, page
+
+    @staticmethod
+    def _cursor_offset(cursor: str, snapshot: DataSnapshot) -> int:
+        """游标对应的起始位置；数据在两次分页请求之间重新加载过时游标失效"""
+        offset, version = decode_cursor(cursor)
+        if version is not None and version != snapshot.version:
+            raise ValueError("数据已更新，游标已失效，请不带 cursor 参数重新查询")
+        return offset
+
+    async def get_all_payload(self, compact: bool = False, cursor: str = None,
+                              max_results: int = MAX_RESULTS, max_bytes: int = MAX_BYTES) -> Tuple[str, PageInfo]:
+        """按文件分页获取所有数据的JSON文本，加载数据时已序列化
+
+        每页最多 max_results 个文件、约 max_bytes 字节；单个文件超出字节上限时只返回结构预览。
+        """
+        snapshot = self.snapshot
+        offset = self._cursor_offset(cursor, snapshot)
+        file_ids = list(snapshot.data)
+        max_results = max(1, max_results)
 
-    async def get_all_data(self) -> Dict[str, Any]:
-        """获取所有加载的数据"""
-        logger.info(f"返回所有数据，共 {len(self.data)} 个文件")
-        return self.data
+        # 全部数据在一页之内时直接返回预先拼好的完整内容
+        if offset == 0 and len(file_ids) <= max_results and (
+                not max_bytes or snapshot.all_payload.size(compact) <= max_bytes):
+            log_event(logging.INFO, "get_all_data", files=len(file_ids), compact=compact)
+            return snapshot.all_payload.text(compact), PageInfo(total=len(file_ids), returned=len(file_ids))
 
-    async def get_file_data(self, file_id: str) -> Dict[str, Any]:
-        """获取指定文件的数据"""
-        if file_id in self.data:
-            logger.info(f"找到文件数据: {file_id}")
-            return {file_id: self.data[file_id]}
+        page = PageInfo(total=len(file_ids), returned=0, offset=offset)
+        payloads = []
+        used_bytes = 0
+        for file_id in file_ids[offset:offset + max_results]:
+            payload = snapshot.file_payloads[file_id]
+            if max_bytes and used_bytes + payload.size(compact) > max_bytes:
+                if page.returned:
+                    break
+                payload = join_object([(file_id, Payload.encode(preview(snapshot.data[file_id])))])
+                page.truncated_paths.append(file_id)
+            payloads.append(payload)
+            used_bytes += payload.size(compact)
+            page.returned += 1
+
+        if offset + page.returned < len(file_ids):
+            page.next_cursor = encode_cursor(offset + page.returned, snapshot.version)
+
+        log_event(logging.INFO, "get_all_data", files=len(file_ids), offset=offset, returned=page.returned,
+                  compact=compact)
+        return merge_objects(payloads).text(compact), page
+
+    async def get_file_payload(self, file_id: str, compact: bool = False) -> str:
+        """获取指定文件数据的JSON文本，文件不存在时返回空字符串"""
+        payload = self.snapshot.file_payloads.get(file_id)
+        if payload is not None:
+            log_event(logging.INFO, "get_file_data", file_id=file_id, found=True, compact=compact)
+            return payload.text(compact)
         else:
-            logger.warning(f"未找到文件: {file_id}")
-            return {}
+            log_event(logging.WARNING, "get_file_data", file_id=file_id, found=False)
+            return ""
 
     def get_data_summary(self) -> str:
         """获取数据摘要，用于调试"""
         summary = []
-        for file_id, content in self.data.items():
+        for file_id, content in self.snapshot.data.items():
             summary.append(f"文件: {file_id}.json")
             if isinstance(content, dict):
                 summary.append(f"  - 顶级键: {list(content.keys())}")
@@ -210,13 +375,39 @@ async def list_tools() -> List[types.Tool]:
     return [
         types.Tool(
             name="search_person_profiles",
-            description="在person_profile数据中搜索内容。可以搜索键名和值，支持嵌套结构的深度搜索。",
+            description="在person_profile数据中搜索内容。可以搜索键名和值，支持嵌套结构的深度搜索，结果按相关度排序并分页返回。",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "query": {
                         "type": "string",
                         "description": "要搜索的关键词或短语"
+                    },
+                    "top_k": {
+                        "type": "integer",
+                        "description": "最多返回的匹配数量，按相关度排序",
+                        "minimum": 1,
+                        "default": 50
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "上一页返回的 next_cursor，用于获取下一页"
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "每页最多返回的匹配数量",
+                        "minimum": 1,
+                        "default": MAX_RESULTS
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "每页内容的大致字节上限，超出的内容留到下一页或被截断，0表示不限制",
+                        "minimum": 0,
+                        "default": MAX_BYTES
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "为true时返回不带缩进的紧凑JSON"
                     }
                 },
                 "required": ["query"]
@@ -224,10 +415,31 @@ async def list_tools() -> List[types.Tool]:
         ),
         types.Tool(
             name="get_all_profiles",
-            description="获取所有person_profile数据。",
+            description="获取所有person_profile数据。数据较多时分页返回，未返回完的部分可通过 next_cursor 继续获取。",
             inputSchema={
                 "type": "object",
-                "properties": {},
+                "properties": {
+                    "cursor": {
+                        "type": "string",
+                        "description": "上一页返回的 next_cursor，用于获取下一页"
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": "每页最多返回的文件数量",
+                        "minimum": 1,
+                        "default": MAX_RESULTS
+                    },
+                    "max_bytes": {
+                        "type": "integer",
+                        "description": "每页内容的大致字节上限，超出的内容留到下一页或被截断，0表示不限制",
+                        "minimum": 0,
+                        "default": MAX_BYTES
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "为true时返回不带缩进的紧凑JSON"
+                    }
+                },
                 "required": []
             }
         ),
@@ -240,6 +452,10 @@ async def list_tools() -> List[types.Tool]:
                     "file_id": {
                         "type": "string",
                         "description": "JSON文件的名称（不包含.json扩展名）"
+                    },
+                    "compact": {
+                        "type": "boolean",
+                        "description": "为true时返回不带缩进的紧凑JSON"
                     }
                 },
                 "required": ["file_id"]
@@ -256,49 +472,59 @@ async def list_tools() -> List[types.Tool]:
         )
     ]
 
+def page_arguments(arguments: dict) -> Dict[str, Any]:
+    """工具调用中的分页参数；参数由模型生成，超出范围的值按最近的有效值处理"""
+    return {
+        "cursor": arguments.get("cursor") or None,
+        "max_results": max(1, int(arguments.get("max_results") or MAX_RESULTS)),
+        # 0表示不限制，负数按0处理，否则每个结果都会被当作超出上限
+        "max_bytes": max(0, int(arguments.get("max_bytes", MAX_BYTES) or 0)),
+    }
+
+def page_contents(text: str, page: PageInfo, compact: bool) -> List[types.TextContent]:
+    """结果不完整时附加一段分页信息，提示调用方如何获取剩余内容"""
+    contents = [types.TextContent(type="text", text=text)]
+    if not page.complete:
+        contents.append(types.TextContent(type="text", text=dump_json({"pagination": page.to_dict()}, compact)))
+    return contents
+
 @app.call_tool()
 async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
     """MCP标准接口 - 调用工具"""
     
     # 获取数据管理器实例
     dm = get_data_manager()
+    compact = bool(arguments.get("compact", COMPACT_JSON))
     
     if name == "search_person_profiles":
         query = arguments.get("query")
         if not query:
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"error": "缺少必需的参数 'query'"}, ensure_ascii=False, indent=2)
+                text=dump_json({"error": "缺少必需的参数 'query'"}, compact)
             )]
         
-        logger.info(f"搜索请求: {query}")
         try:
-            results = await dm.search_content(query)
-            logger.info(f"搜索结果: {results}")
-            return [types.TextContent(
-                type="text",
-                text=json.dumps(results, ensure_ascii=False, indent=2)
-            )]
+            top_k = max(1, int(arguments.get("top_k") or 50))
+            results, page = await dm.search_page(query, top_k, **page_arguments(arguments))
+            log_payload("搜索结果", results)
+            return page_contents(dump_json(results, compact), page, compact)
         except Exception as e:
             logger.error(f"搜索时出错: {e}")
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"error": f"搜索时发生错误: {str(e)}"}, ensure_ascii=False, indent=2)
+                text=dump_json({"error": f"搜索时发生错误: {str(e)}"}, compact)
             )]
     
     elif name == "get_all_profiles":
-        logger.info("获取所有profile数据请求")
         try:
-            all_data = await dm.get_all_data()
-            return [types.TextContent(
-                type="text",
-                text=json.dumps(all_data, ensure_ascii=False, indent=2)
-            )]
+            text, page = await dm.get_all_payload(compact, **page_arguments(arguments))
+            return page_contents(text, page, compact)
         except Exception as e:
             logger.error(f"获取所有数据时出错: {e}")
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"error": f"获取数据时发生错误: {str(e)}"}, ensure_ascii=False, indent=2)
+                text=dump_json({"error": f"获取数据时发生错误: {str(e)}"}, compact)
             )]
     
     elif name == "get_profile_by_file":
@@ -306,31 +532,30 @@ async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
         if not file_id:
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"error": "缺少必需的参数 'file_id'"}, ensure_ascii=False, indent=2)
+                text=dump_json({"error": "缺少必需的参数 'file_id'"}, compact)
             )]
         
-        logger.info(f"获取文件数据请求: {file_id}")
         try:
-            file_data = await dm.get_file_data(file_id)
-            if not file_data:
+            file_payload = await dm.get_file_payload(file_id, compact)
+            if not file_payload:
                 return [types.TextContent(
                     type="text",
-                    text=json.dumps({"error": f"未找到文件: {file_id}.json"}, ensure_ascii=False, indent=2)
+                    text=dump_json({"error": f"未找到文件: {file_id}.json"}, compact)
                 )]
             
             return [types.TextContent(
                 type="text",
-                text=json.dumps(file_data, ensure_ascii=False, indent=2)
+                text=file_payload
             )]
         except Exception as e:
             logger.error(f"获取文件数据时出错: {e}")
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"error": f"获取文件数据时发生错误: {str(e)}"}, ensure_ascii=False, indent=2)
+                text=dump_json({"error": f"获取文件数据时发生错误: {str(e)}"}, compact)
             )]
     
     elif name == "get_data_summary":
-        logger.info("获取数据摘要请求")
+        log_event(logging.INFO, "call_tool", tool=name)
         try:
             summary = dm.get_data_summary()
             return [types.TextContent(
@@ -347,7 +572,7 @@ async def call_tool(name: str, arguments: dict) -> List[types.TextContent]:
     else:
         return [types.TextContent(
             type="text",
-            text=json.dumps({"error": f"未知的工具: {name}"}, ensure_ascii=False, indent=2)
+            text=dump_json({"error": f"未知的工具: {name}"}, compact)
         )]
 
 async def main():
@@ -378,14 +603,21 @@ async def main():
         logger.info(f"  - 名称: {tool.name}")
         logger.info(f"  - 描述: {tool.description}")
     
+    # 后台监听数据目录，文件变化时增量重新加载，无需重启服务器
+    watcher = asyncio.create_task(dm.watch()) if RELOAD_INTERVAL > 0 else None
+    
     logger.info("=== 服务器准备就绪，等待客户端连接 ===")
 
-    async with stdio_server() as streams:
-        await app.run(
-            streams[0],  # stdin
-            streams[1],  # stdout
-            app.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as streams:
+            await app.run(
+                streams[0],  # stdin
+                streams[1],  # stdout
+                app.create_initialization_options()
+            )
+    finally:
+        if watcher is not None:
+            watcher.cancel()
 
 if __name__ == '__main__':
     try: